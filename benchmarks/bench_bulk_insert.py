@@ -0,0 +1,54 @@
+"""Импорт большого числа событий: прежний add_event (добавление в конец и
+пересортировка всего дня), вставка двоичным поиском по одному событию и
+массовый add_events.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_bulk_insert [число_событий]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_events
+from data.schedule_manager import ScheduleManager
+from data.storage import MemoryStorage, start_minutes
+
+
+class ResortingStorage(MemoryStorage):
+    """Прежнее поведение вставки: append + sort всего дня"""
+
+    def insert(self, date, event):
+        self.schedule[date].append(event)
+        self.schedule[date].sort(key=start_minutes)
+        self._by_id[event['id']] = (date, event)
+
+
+def one_by_one(manager, events):
+    for event in events:
+        manager.add_event(*event)
+
+
+def bulk(manager, events):
+    manager.add_events(events)
+
+
+def measure(function, storage, events):
+    manager = ScheduleManager(storage=storage)
+    start = time.perf_counter()
+    function(manager, events)
+    elapsed = time.perf_counter() - start
+    assert sum(len(day) for day in manager.schedule.values()) == len(events)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for title, days in (("по году", 365), ("в один день", 1)):
+        events = make_events(count, days=days)
+        print(f"{count} событий {title}:")
+        print(f"  append + sort:        {measure(one_by_one, ResortingStorage(), events):.2f} с")
+        print(f"  вставка по одному:    {measure(one_by_one, MemoryStorage(), events):.2f} с")
+        print(f"  add_events:           {measure(bulk, MemoryStorage(), events):.2f} с")
+
+
+if __name__ == '__main__':
+    main()
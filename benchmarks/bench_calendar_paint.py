@@ -0,0 +1,63 @@
+"""Время перерисовки месяца главного календаря, в котором у каждого дня
+20+ событий: отрисовка ячеек заново против кэша готовых изображений.
+
+Перерисовки при перетаскивании окна не меняют размер ячеек, поэтому
+измеряется серия repaint() одного и того же месяца. Запуск из корня проекта:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_calendar_paint [число_кадров]
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+from PyQt5.QtWidgets import QApplication
+
+from data.schedule_manager import ScheduleManager
+from ui.main_window import RoundedCalendar
+
+EVENTS_PER_DAY = 24
+
+
+def make_manager(first_day):
+    manager = ScheduleManager()
+    events = []
+    for offset in range(42):
+        day = (first_day + timedelta(days=offset)).isoformat()
+        for i in range(EVENTS_PER_DAY):
+            minutes = 8 * 60 + i * 30
+            events.append((day, f"{minutes // 60:02d}:{minutes % 60:02d}",
+                           f"{(minutes + 30) // 60:02d}:{(minutes + 30) % 60:02d}",
+                           "Лекция", "#007aff", f"событие {i}"))
+    manager.add_events(events)
+    return manager
+
+
+def frame_time(calendar, frames):
+    calendar.repaint()  # первый кадр заполняет кэши
+    calendar.reset_paint_stats()
+    start = time.perf_counter()
+    for _ in range(frames):
+        calendar.repaint()
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    app = QApplication(sys.argv)
+    calendar = RoundedCalendar(make_manager(date(2024, 2, 26)))
+    calendar.setCurrentPage(2024, 3)
+    calendar.resize(1000, 700)
+    calendar.show()
+    app.processEvents()
+
+    calendar.use_pixmap_cache = False
+    before = frame_time(calendar, frames)
+    calendar.use_pixmap_cache = True
+    after = frame_time(calendar, frames)
+    print(f"Событий в день: {EVENTS_PER_DAY}, кадров: {frames}")
+    print(f"Кадр без кэша изображений: {before * 1000:.1f} мс")
+    print(f"Кадр с кэшем изображений:  {after * 1000:.1f} мс")
+    print(calendar.paint_stats())
+
+
+if __name__ == '__main__':
+    main()
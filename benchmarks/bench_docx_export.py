@@ -0,0 +1,70 @@
+"""Выгрузка расписания в DOCX: прежний способ (table.add_row и оформление
+каждой ячейки через python-docx) и потоковая сборка XML строк таблицы.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_docx_export [число_событий]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from docx import Document
+from docx.shared import Pt
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.enum.table import WD_ALIGN_VERTICAL
+
+from benchmarks.synthetic import make_events
+from data.schedule_manager import ScheduleManager
+from export.export_to_docx import COLUMNS, export_schedule_to_docx
+
+
+def export_by_rows(schedule, file_name):
+    """Прежняя выгрузка: строка за строкой, формат задаётся в каждой ячейке"""
+    doc = Document()
+    doc.add_heading("Расписание", level=0)
+    table = doc.add_table(rows=1, cols=len(COLUMNS))
+    table.style = 'Table Grid'
+    for cell, (title, _) in zip(table.rows[0].cells, COLUMNS):
+        cell.text = title
+    for date, events in sorted(schedule.items()):
+        for event in events:
+            row_cells = table.add_row().cells
+            row_cells[0].text = date
+            for cell, (_, key) in zip(row_cells[1:], COLUMNS[1:]):
+                cell.text = event.get(key, "")
+            for cell in row_cells:
+                paragraph = cell.paragraphs[0]
+                paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+                paragraph.runs[0].font.size = Pt(10)
+                cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
+    doc.save(file_name)
+
+
+def measure(function, schedule, count, file_name):
+    start = time.perf_counter()
+    function(schedule, file_name)
+    elapsed = time.perf_counter() - start
+    rows = len(Document(file_name).tables[0].rows) - 1
+    assert rows == count, (rows, count)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    manager = ScheduleManager()
+    manager.add_events(make_events(count))
+    schedule = manager.get_schedule()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "schedule.docx")
+        print(f"{count} событий:")
+        for title, function in (("add_row по строке", export_by_rows),
+                                ("потоковый XML", export_schedule_to_docx)):
+            elapsed = measure(function, schedule, count, file_name)
+            print(f"  {title:20} {elapsed:.2f} с, {count / elapsed:.0f} событий/с, "
+                  f"{os.path.getsize(file_name) / 1024:.0f} КБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Память на одно событие: словарь, загруженный из schedule.json, против
+компактной записи data.event.Event (__slots__, время в минутах,
+интернированные тема и цвет).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_event_memory [число_событий]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from benchmarks.synthetic import make_events
+from data.event import Event
+from data.schedule_manager import new_event_id
+
+# Владельцы событий: в реальных данных их немного
+USER_IDS = ["0Md4UBw1r3PmfsqXPM9QYHst1hd2", "Xq3vT8LmN2pRs5KwYz7AbCdEfGh1"]
+
+
+def retained(build, blob):
+    """Сколько байт остаётся занято результатом build(blob)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build(blob)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def as_dicts(blob):
+    return json.loads(blob)
+
+
+def as_events(blob):
+    return [Event.from_dict(event) for event in json.loads(blob)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    # Как после загрузки из файла: у каждого события свои строки,
+    # и у каждого, как в Firestore, есть userId
+    blob = json.dumps([
+        {'id': new_event_id(), 'start_time': start_time, 'end_time': end_time,
+         'theme': theme, 'color': color, 'description': description,
+         'userId': USER_IDS[i % len(USER_IDS)]}
+        for i, (_, start_time, end_time, theme, color, description) in enumerate(make_events(count))
+    ], ensure_ascii=False)
+
+    before = retained(as_dicts, blob)
+    after = retained(as_events, blob)
+    print(f"Событий: {count}")
+    print(f"Словари: {before / 2 ** 20:.1f} МБ, {before / count:.0f} байт на событие")
+    print(f"Event:   {after / 2 ** 20:.1f} МБ, {after / count:.0f} байт на событие")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Время загрузки и сохранения расписания: прежний путь с записью
+schedule.json (indent=4) и повторным чтением против прямого
+преобразования в памяти с одной компактной записью.
+
+Firestore заменён локальным клиентом, поэтому измеряется только
+работа на стороне приложения. Запуск из корня проекта:
+    python -m benchmarks.bench_file_io [число_событий]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_events
+from data.event import json_default
+from data.schedule_manager import ScheduleManager
+from utils import file_utils
+from utils.local_firestore import LocalFirestoreClient
+
+
+def old_load(manager):
+    final_data = file_utils.convert_to_final_format(
+        file_utils.convert_from_firebase_format(file_utils.get_events_from_firestore()))
+    final_data.pop("color", None)
+    with open(file_utils.SCHEDULE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(final_data, f, ensure_ascii=False, indent=4)
+    with open(file_utils.SCHEDULE_FILE, 'r', encoding='utf-8') as f:
+        manager.set_schedule(json.load(f))
+
+
+def new_load(manager):
+    file_utils.load_schedule_from_file(manager)
+
+
+def old_save(manager):
+    with open(file_utils.SCHEDULE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(dict(manager.schedule), f, ensure_ascii=False, indent=4, default=json_default)
+    return file_utils.convert_to_firebase_format(file_utils.load_local_json(file_utils.SCHEDULE_FILE))
+
+
+def new_save(manager):
+    file_utils.write_local_schedule(manager.schedule)
+    return file_utils.convert_to_firebase_format(manager.schedule)
+
+
+def measure(function, manager):
+    start = time.perf_counter()
+    function(manager)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    os.chdir(tempfile.mkdtemp())
+    file_utils.set_offline_mode(True)
+
+    source = ScheduleManager()
+    for event in make_events(count):
+        source.add_event(*event)
+    client = LocalFirestoreClient()
+    file_utils.set_firestore_client(client)
+    file_utils.commit_operations([("set", doc_id, event) for doc_id, event in
+                                  file_utils.convert_to_firebase_format(source.schedule).items()])
+
+    # Загрузка из Firestore идёт только вне офлайн-режима
+    file_utils.set_offline_mode(False)
+    load_before = measure(old_load, ScheduleManager())
+    load_after = measure(new_load, ScheduleManager())
+    size_before = len(json.dumps(dict(source.schedule), ensure_ascii=False, indent=4, default=json_default).encode())
+
+    file_utils.set_offline_mode(True)
+    save_before = measure(old_save, source)
+    save_after = measure(new_save, source)
+    size_after = os.path.getsize(file_utils.SCHEDULE_FILE)
+
+    print(f"Событий: {count}")
+    print(f"Загрузка:   до {load_before:.2f} с, после {load_after:.2f} с")
+    print(f"Сохранение: до {save_before:.2f} с, после {save_after:.2f} с")
+    print(f"Размер schedule.json: до {size_before / 2 ** 20:.1f} МБ, после {size_after / 2 ** 20:.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Пропускная способность записи в Firestore через локальный клиент
+с имитацией сетевой задержки коммита.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_firestore_sync [число_событий] [задержка_коммита_с]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_events
+from data.schedule_manager import ScheduleManager
+from utils import file_utils
+from utils.local_firestore import LocalFirestoreClient
+
+
+def upload(firebase_events, latency, workers):
+    client = LocalFirestoreClient(latency=latency)
+    file_utils.set_firestore_client(client)
+    operations = [("set", doc_id, event) for doc_id, event in firebase_events.items()]
+    start = time.perf_counter()
+    failed = file_utils.commit_operations(operations, workers=workers)
+    elapsed = time.perf_counter() - start
+    return elapsed, client.counts['commits'], len(failed)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+
+    manager = ScheduleManager()
+    for event in make_events(count):
+        manager.add_event(*event)
+    firebase_events = file_utils.convert_to_firebase_format(dict(manager.get_schedule()))
+
+    print(f"Событий: {count}, задержка коммита: {latency * 1000:.0f} мс, batch: {file_utils.BATCH_SIZE}")
+    for workers in (1, file_utils.COMMIT_WORKERS, 2 * file_utils.COMMIT_WORKERS):
+        elapsed, commits, failed = upload(firebase_events, latency, workers)
+        print(f"Потоков: {workers:2d}: {elapsed:.2f} с, {count / elapsed:.0f} событий/с, "
+              f"коммитов: {commits}, ошибок: {failed}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Задержка нечёткого поиска по триграммам на большом расписании:
+построение индекса и запросы с опечатками.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_fuzzy_search [число_событий]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_events
+from data.schedule_manager import ScheduleManager
+
+QUERIES = ["докалд", "конференцыи", "програмированию", "подготовка к экзамену", "лабораторня работа"]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    manager = ScheduleManager()
+    manager.add_events(make_events(count))
+
+    start = time.perf_counter()
+    manager.fuzzy_search("прогрев")
+    print(f"Событий: {count}, построение индекса: {time.perf_counter() - start:.2f} с")
+
+    for query in QUERIES:
+        start = time.perf_counter()
+        results = manager.fuzzy_search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = results[0][1]['description'] if results else "-"
+        print(f"{query!r}: {elapsed:.1f} мс, найдено {len(results)}, лучшее: {best!r}")
+
+
+if __name__ == '__main__':
+    main()
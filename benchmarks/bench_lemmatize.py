@@ -0,0 +1,50 @@
+"""Сравнение лемматизации по одной строке через полный конвейер spacy
+с пакетной лемматизацией ScheduleManager.lemmatize_texts.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_lemmatize [число_текстов] [число_процессов]
+"""
+import sys
+import time
+
+import spacy
+
+from benchmarks.synthetic import make_texts
+from data.language_model import MODEL_NAME
+from data.schedule_manager import ScheduleManager
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_process = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    texts = make_texts(count)
+
+    # Старый путь: полный конвейер (с parser и ner), по одной строке
+    full_nlp = spacy.load(MODEL_NAME)
+    start = time.perf_counter()
+    expected = [' '.join([token.lemma_ for token in full_nlp(text)]) for text in texts]
+    per_string = time.perf_counter() - start
+
+    manager = ScheduleManager()
+    manager.nlp.get()
+    start = time.perf_counter()
+    batched = manager.lemmatize_texts(texts)
+    batch_time = time.perf_counter() - start
+
+    # Кэш лемм после первого прохода заполнен: без очистки второй замер
+    # мерил бы только обращения к кэшу
+    manager.lemma_cache.clear()
+    start = time.perf_counter()
+    manager.lemmatize_texts(texts, n_process=n_process)
+    multi_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, batched) if a != b)
+    print(f"Текстов: {count}")
+    print(f"По одной строке, полный конвейер: {per_string:.2f} с ({count / per_string:.0f} текстов/с)")
+    print(f"nlp.pipe без parser/ner:          {batch_time:.2f} с (x{per_string / batch_time:.1f})")
+    print(f"nlp.pipe, процессов: {n_process}:         {multi_time:.2f} с (x{per_string / multi_time:.1f})")
+    print(f"Расхождений в леммах: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
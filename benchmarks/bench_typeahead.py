@@ -0,0 +1,36 @@
+"""Задержка поиска по мере ввода: запрос набирается по одной букве,
+как в строке поиска главного окна, и замеряется каждое нажатие.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_typeahead [число_событий]
+"""
+import sys
+import time
+
+from benchmarks.synthetic import make_events
+from data.schedule_manager import ScheduleManager
+
+QUERIES = ["доклад конференция", "лабораторная работа", "экзамен по программированию"]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    manager = ScheduleManager()
+    manager.add_events(make_events(count))
+
+    start = time.perf_counter()
+    manager.ensure_trigram_index()
+    print(f"Событий: {count}, построение индекса: {time.perf_counter() - start:.2f} с")
+
+    for query in QUERIES:
+        for length in range(1, len(query) + 1):
+            text = query[:length]
+            start = time.perf_counter()
+            results = manager.prefix_search(text)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{text!r}: {elapsed:.1f} мс, найдено {len(results)}")
+    print(manager.typeahead.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Генерация синтетических расписаний для бенчмарков"""
+import random
+from datetime import date, timedelta
+
+THEMES = ["Лекция", "Встреча", "Семинар", "Экзамен", "Консультация", "Тренировка"]
+WORDS = [
+    "обсуждение", "проекта", "курсовой", "работы", "по", "математическому", "анализу",
+    "подготовка", "к", "экзамену", "встреча", "с", "научным", "руководителем",
+    "лабораторная", "программированию", "доклад", "на", "конференции", "отчёт",
+]
+COLORS = ["#3e5d07", "#8b5d24", "#e6e0c8", "#007aff", "#ff9500"]
+
+
+def make_texts(count, seed=0):
+    """Список коротких описаний в духе реальных событий"""
+    rnd = random.Random(seed)
+    return [' '.join(rnd.choices(WORDS, k=rnd.randint(2, 8))) for _ in range(count)]
+
+
+def make_events(count, days=365, start=date(2024, 1, 1), seed=0):
+    """Список кортежей (date, start_time, end_time, theme, color, description)"""
+    rnd = random.Random(seed)
+    events = []
+    for _ in range(count):
+        day = (start + timedelta(days=rnd.randrange(days))).isoformat()
+        begin = rnd.randrange(8 * 60, 20 * 60)
+        end = begin + rnd.choice([30, 45, 60, 90])
+        events.append((
+            day,
+            f"{begin // 60:02d}:{begin % 60:02d}",
+            f"{end // 60:02d}:{end % 60:02d}",
+            rnd.choice(THEMES),
+            rnd.choice(COLORS),
+            ' '.join(rnd.choices(WORDS, k=rnd.randint(2, 8))),
+        ))
+    return events
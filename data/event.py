@@ -0,0 +1,147 @@
+import sys
+from collections.abc import Mapping
+
+# Общие объекты int для всех минут суток (и 24:00 — конца суток):
+# события не хранят свои копии чисел
+_MINUTES = list(range(24 * 60 + 1))
+
+
+def parse_time(value):
+    """"HH:mm" -> минуты от полуночи; ValueError, если это не время суток"""
+    if isinstance(value, int):
+        minutes = value
+    else:
+        hours, separator, rest = str(value).partition(":")
+        if not separator or not 0 <= int(rest) < 60:
+            raise ValueError(f"Некорректное время: {value!r}")
+        minutes = int(hours) * 60 + int(rest)
+    if not 0 <= minutes < len(_MINUTES):
+        raise ValueError(f"Некорректное время: {value!r}")
+    return _MINUTES[minutes]
+
+
+def _minutes_and_raw(value):
+    """(минуты, исходная строка или None).
+
+    Строка сохраняется, если format_time её не воспроизводит ("9:00", пустое
+    или некорректное время): такие значения из Firestore отдаются обратно
+    без изменений, а для сортировки некорректное время считается 00:00.
+    """
+    minutes = _TIME_INDEX.get(value) if isinstance(value, str) else None
+    if minutes is not None:
+        # Каноническое "HH:mm" — словарь вместо разбора строки
+        return _MINUTES[minutes], None
+    try:
+        minutes = parse_time(value)
+    except (TypeError, ValueError):
+        return _MINUTES[0], value
+    if isinstance(value, str) and format_time(minutes) != value:
+        return minutes, value
+    return minutes, None
+
+
+def format_time(minutes):
+    """Минуты от полуночи -> "HH:mm" """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+# Готовые строки "HH:mm" для всех минут: время события не форматируется
+# и не разбирается заново
+_TIME_STRINGS = [format_time(minutes) for minutes in _MINUTES]
+_TIME_INDEX = {text: minutes for minutes, text in enumerate(_TIME_STRINGS)}
+
+
+class Event(Mapping):
+    """Компактная запись события.
+
+    Время хранится в минутах от полуночи, тема и цвет интернируются, а
+    __slots__ избавляет от словаря на каждый объект. Для совместимости
+    событие ведёт себя как неизменяемый словарь с прежними ключами
+    ('id', 'start_time', 'end_time', 'theme', 'color', 'description'),
+    где время — строка "HH:mm", поэтому интерфейс и экспорт работают с ним
+    как раньше. 'userId', который есть у каждого события из Firestore,
+    тоже интернируется; прочие поля хранятся в extra. Время, которое нельзя
+    записать как "HH:mm", хранится исходной строкой в raw_times.
+    """
+
+    __slots__ = ('id', 'start', 'end', 'theme', 'color', 'description', 'user_id', 'raw_times', 'extra')
+
+    KEYS = ('id', 'start_time', 'end_time', 'theme', 'color', 'description')
+
+    def __init__(self, id, start, end, theme, color, description, extra=None, user_id=None):
+        self.id = id
+        self.start, raw_start = _minutes_and_raw(start)
+        self.end, raw_end = _minutes_and_raw(end)
+        self.raw_times = None if raw_start is None and raw_end is None else (raw_start, raw_end)
+        self.theme = sys.intern(theme)
+        self.color = sys.intern(color)
+        self.description = description
+        self.user_id = sys.intern(user_id) if isinstance(user_id, str) else user_id
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, Event):
+            return data
+        extra = {key: value for key, value in data.items() if key not in cls.KEYS and key != 'userId'}
+        return cls(data['id'], data['start_time'], data['end_time'], data.get('theme', ""),
+                   data.get('color', "#007AFF"), data.get('description', ""), extra, data.get('userId'))
+
+    @property
+    def start_time(self):
+        if self.raw_times is not None and self.raw_times[0] is not None:
+            return self.raw_times[0]
+        return _TIME_STRINGS[self.start]
+
+    @property
+    def end_time(self):
+        if self.raw_times is not None and self.raw_times[1] is not None:
+            return self.raw_times[1]
+        return _TIME_STRINGS[self.end]
+
+    def __getitem__(self, key):
+        if key == 'start_time':
+            return self.start_time
+        if key == 'end_time':
+            return self.end_time
+        if key in ('id', 'theme', 'color', 'description'):
+            return getattr(self, key)
+        if key == 'userId' and self.user_id is not None:
+            return self.user_id
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.KEYS
+        if self.user_id is not None:
+            yield 'userId'
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return (len(self.KEYS) + (self.user_id is not None) +
+                (len(self.extra) if self.extra else 0))
+
+    def to_dict(self):
+        # Словарь собирается прямо из слотов, без обхода через __iter__/__getitem__
+        data = {'id': self.id, 'start_time': self.start_time, 'end_time': self.end_time,
+                'theme': self.theme, 'color': self.color, 'description': self.description}
+        if self.user_id is not None:
+            data['userId'] = self.user_id
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __repr__(self):
+        return f"Event({self.to_dict()!r})"
+
+
+def json_default(value):
+    """Хук для json.dump: события сохраняются как обычные словари"""
+    if isinstance(value, Event):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
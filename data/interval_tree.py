@@ -0,0 +1,136 @@
+import random
+
+
+class _Node:
+    __slots__ = ('start', 'key', 'end', 'event', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, event):
+        self.start = event.start
+        self.key = event['id']
+        self.end = event.end
+        self.event = event
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = event.end
+
+
+def _update(node):
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+
+def _rotate_right(node):
+    left = node.left
+    node.left = left.right
+    left.right = node
+    _update(node)
+    _update(left)
+    return left
+
+
+def _rotate_left(node):
+    right = node.right
+    node.right = right.left
+    right.left = node
+    _update(node)
+    _update(right)
+    return right
+
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if (new.start, new.key) < (node.start, node.key):
+        node.left = _insert(node.left, new)
+        if node.left.priority > node.priority:
+            return _rotate_right(node)
+    else:
+        node.right = _insert(node.right, new)
+        if node.right.priority > node.priority:
+            return _rotate_left(node)
+    _update(node)
+    return node
+
+
+def _merge(left, right):
+    """Сливает два дерева, где все ключи left меньше ключей right"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _remove(node, start, key):
+    if node is None:
+        return None, False
+    if (start, key) < (node.start, node.key):
+        node.left, removed = _remove(node.left, start, key)
+    elif (start, key) > (node.start, node.key):
+        node.right, removed = _remove(node.right, start, key)
+    else:
+        return _merge(node.left, node.right), True
+    if removed:
+        _update(node)
+    return node, removed
+
+
+def _collect(node, start, end, result):
+    # В поддереве нет событий, закончившихся позже start
+    if node is None or node.max_end <= start:
+        return
+    _collect(node.left, start, end, result)
+    if node.start >= end:
+        # Здесь и правее события начинаются не раньше end
+        return
+    if node.end > start:
+        result.append(node.event)
+    _collect(node.right, start, end, result)
+
+
+class IntervalTree:
+    """Дерево интервалов событий одного дня (декартово дерево по началу).
+
+    Узлы упорядочены по (началу, id) и хранят максимум окончаний в своём
+    поддереве, поэтому вставка и удаление стоят O(log n), а поиск накладок —
+    O(log n + k): поддеревья, где все события закончились до начала
+    интервала или начинаются после его конца, не обходятся. Событие на весь
+    день не заставляет просматривать остальные события дня.
+    """
+
+    def __init__(self, events=()):
+        self._root = None
+        self._size = 0
+        for event in events:
+            self.insert(event)
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, event):
+        self._root = _insert(self._root, _Node(event))
+        self._size += 1
+
+    def remove(self, event):
+        """Удаляет событие (по времени начала и id); False, если его нет"""
+        self._root, removed = _remove(self._root, event.start, event['id'])
+        if removed:
+            self._size -= 1
+        return removed
+
+    def overlaps(self, start, end):
+        """События, пересекающиеся с [start, end) в минутах, в порядке начала"""
+        result = []
+        _collect(self._root, start, end, result)
+        return result
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+
+from data.event import json_default
+
+# После скольких записей журнал сворачивается в снимок
+COMPACT_EVERY = 1000
+
+
+def write_json_atomic(path, data):
+    """Надёжно записывает компактный JSON: временный файл, fsync, замена"""
+    tmp_path = path + ".tmp"
+    # json.dumps кодирует целиком на C; json.dump в файл идёт через
+    # медленный кодировщик на Python, порция за порцией
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=json_default)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ScheduleJournal:
+    """Журнал изменений расписания, дописываемый по одной строке JSON.
+
+    Каждая запись ("add", "edit" или "delete") сбрасывается на диск сразу,
+    поэтому сохранение правки стоит O(1) операций ввода-вывода, а при сбое
+    теряется не больше последней (недописанной) записи. compact() сворачивает
+    журнал в снимок snapshot_path и очищает его; для хранилищ, которые сами
+    сохраняют каждое изменение (SQLite), snapshot_path=None и журнал нужен
+    только для изменений, ещё не применённых поверх Firestore (см.
+    utils.file_utils.load_schedule_from_file). pending_path — файл-метка,
+    которая создаётся при первой записи и означает, что есть изменения,
+    ещё не отправленные в Firestore.
+    """
+
+    def __init__(self, path, snapshot_path, pending_path=None, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.pending_path = pending_path
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._file = None
+        self.record_count = self._count_records()
+
+    def _count_records(self):
+        if not os.path.exists(self.path):
+            return 0
+        # Читается побайтно: недописанный при сбое символ UTF-8 не должен мешать
+        with open(self.path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+
+    def has_records(self):
+        return self.record_count > 0
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Дописывает несколько записей с одним fsync (для массового импорта)"""
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._file.tell() and not self._ends_with_newline():
+                    # Последняя строка не дописана: новые записи начинаются с новой строки
+                    self._file.write("\n")
+            self._file.write(''.join(
+                json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=json_default) + "\n"
+                for record in records))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.record_count += len(records)
+            self.mark_pending()
+
+    def mark_pending(self):
+        """Ставит метку о том, что есть изменения, ещё не отправленные в Firestore"""
+        if self.pending_path and not os.path.exists(self.pending_path):
+            open(self.pending_path, 'w').close()
+
+    def needs_compaction(self):
+        # compact_every=None: журнал не сворачивается (снимок на диске не трогается)
+        return self.compact_every is not None and self.record_count >= self.compact_every
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def replay(self, schedule_manager):
+        """Применяет записи журнала к уже загруженному снимку.
+
+        Недописанная при сбое запись пропускается, и журнал переписывается
+        без неё: иначе следующие записи дописывались бы в ту же строку
+        и терялись бы при каждом следующем запуске.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        applied = 0
+        good_lines = []
+        damaged = False
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print("Журнал расписания содержит недописанную запись, она пропущена.")
+                    damaged = True
+                    continue
+                if not line.endswith(b"\n"):
+                    # Запись цела, но перевод строки не успел записаться
+                    damaged = True
+                    line += b"\n"
+                schedule_manager.apply_record(record)
+                good_lines.append(line)
+                applied += 1
+        if damaged:
+            self._rewrite(good_lines)
+        return applied
+
+    def _rewrite(self, lines):
+        """Атомарно заменяет журнал уцелевшими записями"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.record_count = len(lines)
+
+    def compact(self, schedule):
+        """Записывает снимок расписания и очищает журнал.
+
+        Записи применяются идемпотентно, поэтому сбой между записью снимка
+        и очисткой журнала не портит данные.
+        """
+        with self._lock:
+            if self.snapshot_path is not None:
+                write_json_atomic(self.snapshot_path, dict(schedule))
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self.record_count = 0
+        print("Журнал расписания свёрнут в снимок.")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
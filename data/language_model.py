@@ -0,0 +1,97 @@
+import threading
+import time
+
+# Модель spacy для русского языка
+MODEL_NAME = "ru_core_news_sm"
+# Компоненты конвейера, которые не нужны для получения лемм
+UNUSED_PIPES = ("parser", "ner")
+# Через сколько секунд простоя модель выгружается из памяти (None — никогда)
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+class LanguageModel:
+    """Ленивая обёртка над моделью spacy.
+
+    Модель загружается при первом обращении или заранее в фоновом потоке
+    (warm_up) и выгружается, если ею не пользовались idle_timeout секунд.
+    """
+
+    def __init__(self, name=MODEL_NAME, idle_timeout=DEFAULT_IDLE_TIMEOUT, exclude=UNUSED_PIPES):
+        self.name = name
+        self.exclude = list(exclude)
+        self.idle_timeout = idle_timeout
+        self._nlp = None
+        self._lock = threading.Lock()
+        self._warm_thread = None
+        self._idle_timer = None
+        self._last_used = 0.0
+        # Ошибка последней фоновой загрузки, если она была
+        self.error = None
+
+    def _load(self):
+        # Импорт spacy сам по себе занимает секунды, поэтому он тоже ленивый
+        import spacy
+        return spacy.load(self.name, exclude=self.exclude)
+
+    def get(self):
+        """Возвращает загруженную модель, при необходимости дожидаясь загрузки"""
+        with self._lock:
+            if self._nlp is None:
+                self._nlp = self._load()
+                print(f"Модель {self.name} загружена.")
+            self._last_used = time.monotonic()
+            self._schedule_release()
+            return self._nlp
+
+    def __call__(self, text):
+        return self.get()(text)
+
+    def is_loaded(self):
+        return self._nlp is not None
+
+    def is_loading(self):
+        return self._warm_thread is not None and self._warm_thread.is_alive()
+
+    def warm_up(self):
+        """Начинает загрузку модели в фоновом потоке, не блокируя вызывающего"""
+        if self.is_loaded() or self.is_loading():
+            return
+        self.error = None
+        self._warm_thread = threading.Thread(target=self._warm, name="spacy-warm-up", daemon=True)
+        self._warm_thread.start()
+
+    def _warm(self):
+        try:
+            self.get()
+        except Exception as e:
+            self.error = e
+            print(f"Не удалось загрузить модель {self.name}: {e}")
+
+    def release(self):
+        """Выгружает модель из памяти"""
+        with self._lock:
+            self._nlp = None
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+
+    def _schedule_release(self, delay=None):
+        # Вызывается под self._lock. Таймер один на всё время простоя:
+        # при срабатывании он сам переносится, если модель успели использовать.
+        if not self.idle_timeout or self._idle_timer is not None:
+            return
+        self._idle_timer = threading.Timer(delay or self.idle_timeout, self._release_if_idle)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _release_if_idle(self):
+        with self._lock:
+            self._idle_timer = None
+            if self._nlp is None:
+                return
+            remaining = self.idle_timeout - (time.monotonic() - self._last_used)
+            if remaining > 0:
+                self._schedule_release(remaining)
+                return
+            self._nlp = None
+        print(f"Модель {self.name} выгружена после простоя.")
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+# Сколько различных строк держать в кэше лемм по умолчанию
+DEFAULT_CACHE_SIZE = 50000
+
+
+class LemmaCache:
+    """Ограниченный LRU-кэш «текст -> леммы» со счётчиками попаданий.
+
+    При переполнении вытесняется строка, к которой дольше всего не
+    обращались, поэтому память не растёт в долгих сессиях.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text):
+        """Возвращает леммы для текста или None, если их нет в кэше"""
+        with self._lock:
+            lemmas = self._data.get(text)
+            if lemmas is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(text)
+            self.hits += 1
+            return lemmas
+
+    def put(self, text, lemmas):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[text] = lemmas
+            self._data.move_to_end(text)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Счётчики для подбора размера кэша под реальные данные"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -1,63 +1,423 @@
-import spacy
-from collections import defaultdict
+import threading
+import uuid
+
+from data.event import Event, parse_time
+from data.language_model import LanguageModel, DEFAULT_IDLE_TIMEOUT
+from data.lemma_cache import LemmaCache, DEFAULT_CACHE_SIZE
+from data.storage import MemoryStorage, SEARCH_BATCH_SIZE
+from data.theme_catalog import ThemeCatalog
+from data.trigram_index import TrigramIndex
+from data.typeahead import TypeaheadSearch
+
+# Размер пакета текстов для nlp.pipe
+LEMMATIZE_BATCH_SIZE = 256
+
+# Сколько лемматизированных событий записывать в индекс за одну блокировку:
+# GUI-поток, меняющий расписание, ждёт не дольше одной порции
+SET_LEMMAS_CHUNK = 1000
+
+# Режимы поиска: по леммам (spacy) и нечёткий по триграммам (с опечатками)
+SEARCH_LEMMAS = "lemmas"
+SEARCH_FUZZY = "fuzzy"
+# Поиск по мере ввода: слова запроса — начала слов события
+SEARCH_PREFIX = "prefix"
+# Сколько лучших событий возвращает нечёткий поиск
+FUZZY_SEARCH_LIMIT = 200
+
+
+def new_event_id():
+    return uuid.uuid4().hex
 
-# Загружаем модель для русского языка
-nlp = spacy.load("ru_core_news_sm")
 
 class ScheduleManager:
-    def __init__(self):
-        self.schedule = defaultdict(list)
-
-    def add_event(self, date, start_time, end_time, theme, color, description):
-        self.schedule[date].append({
-            'start_time': start_time,
-            'end_time': end_time,
-            'theme': theme,
-            'color': color,
-            'description': description
-        })
-        self.schedule[date].sort(key=lambda event: event['start_time'])
-
-    def delete_event(self, date, start_time, end_time, theme, color, description):
-        for event in self.schedule[date]:
-            if (event['start_time'] == start_time and
-                    event['end_time'] == end_time and
-                    event['theme'] == theme and
-                    event['color'] == color and
-                    event['description'] == description):
-                self.schedule[date].remove(event)
-                break
-
-    def edit_event(self, date, old_start_time, old_end_time, old_theme, old_color, old_description, new_start_time, new_end_time, new_theme, new_color, new_description):
-        self.delete_event(date, old_start_time, old_end_time, old_theme, old_color, old_description)
-        self.add_event(date, new_start_time, new_end_time, new_theme, new_color, new_description)
+    def __init__(self, storage=None, model_idle_timeout=DEFAULT_IDLE_TIMEOUT, lemma_cache_size=DEFAULT_CACHE_SIZE):
+        # Где хранятся события: в памяти (по умолчанию) или в SQLite, см. data.storage
+        self.storage = storage if storage is not None else MemoryStorage()
+        # Модель spacy загружается лениво, а не при импорте модуля
+        self.nlp = LanguageModel(idle_timeout=model_idle_timeout)
+        # Повторяющиеся темы и описания не лемматизируются повторно
+        self.lemma_cache = LemmaCache(lemma_cache_size)
+        # Журнал изменений (data.journal.ScheduleJournal), если подключён
+        self.journal = None
+        # Темы с числом событий и последним цветом; обновляются при каждом изменении
+        self.themes = ThemeCatalog()
+        # Версия содержимого каждого дня: меняется при любом изменении его событий,
+        # по ней интерфейс понимает, что закэшированную отрисовку дня пора обновить.
+        # Поколение меняется при замене всего расписания.
+        self._generation = 0
+        self._day_versions = {}
+        # Поиск может идти в фоновом потоке (ui.search_worker): изменения расписания
+        # и обращения к поисковому индексу выполняются под этой блокировкой
+        self._lock = threading.RLock()
+        # Триграммный индекс для нечёткого поиска, строится при первом таком поиске
+        self.trigrams = TrigramIndex()
+        # Индекс строится без основной блокировки: построение одновременно идёт
+        # только в одном потоке, а изменения расписания за это время копятся
+        # в _trigram_log и применяются к готовому индексу
+        self._trigram_build_lock = threading.Lock()
+        self._trigram_log = None
+        # Поиск по мере ввода поверх префиксного индекса
+        self.typeahead = TypeaheadSearch(self)
+        # Счётчик изменений: по нему фоновая индексация узнаёт, что события
+        # поменялись, пока она лемматизировала тексты
+        self._mutation_count = 0
+        # Постоянное хранилище (SQLite) может уже содержать события
+        self._rebuild_themes()
+
+    @property
+    def schedule(self):
+        """Всё расписание в виде словаря «дата -> события»"""
+        return self.storage.view()
+
+    def set_schedule(self, data):
+        """Заменяет расписание целиком (например, после загрузки из файла)"""
+        # У каждого события должен быть постоянный id (он же id документа в Firestore)
+        for events in data.values():
+            for event in events:
+                if not isinstance(event, Event) and not event.get('id'):
+                    event['id'] = new_event_id()
+        # В хранилище попадают компактные записи Event, а не словари
+        data = {date: [Event.from_dict(event) for event in events] for date, events in data.items()}
+        with self._lock:
+            self.storage.replace_all(data)
+            self.trigrams.clear()
+            self._rebuild_themes()
+            self._generation += 1
+            self._day_versions = {}
+            self._mutation_count += 1
+
+    def _rebuild_themes(self):
+        self.themes.rebuild(event for _, events in self.storage.view().items() for event in events)
+
+    def attach_journal(self, journal):
+        """Подключает журнал, в который будут записываться все изменения"""
+        self.journal = journal
+
+    def _log(self, record):
+        if self.journal is None:
+            return
+        self.journal.append(record)
+        if self.journal.needs_compaction():
+            self.journal.compact(self.schedule)
+
+    def _log_many(self, records):
+        if self.journal is None or not records:
+            return
+        self.journal.append_many(records)
+        if self.journal.needs_compaction():
+            self.journal.compact(self.schedule)
+
+    def _touch(self, date):
+        self._day_versions[date] = self._day_versions.get(date, 0) + 1
+        self._mutation_count += 1
+
+    def state_token(self):
+        """Значение, которое меняется при любом изменении расписания"""
+        with self._lock:
+            return self._generation, self._mutation_count
+
+    def day_version(self, date):
+        """Значение, которое меняется при каждом изменении событий дня date"""
+        return self._generation, self._day_versions.get(date, 0)
+
+    def _insert_event(self, date, event):
+        with self._lock:
+            self.storage.insert(date, event)
+            self.themes.add(event['theme'], event['color'])
+            self._trigram_add(event)
+            self._touch(date)
+
+    def _remove_event(self, date, event):
+        with self._lock:
+            self.storage.remove(date, event)
+            self.themes.remove(event['theme'])
+            self._trigram_remove(event)
+            self._touch(date)
+
+    def _trigram_add(self, event):
+        self.trigrams.add(event)
+        if self._trigram_log is not None:
+            self._trigram_log.append((True, event))
+
+    def _trigram_remove(self, event):
+        self.trigrams.remove(event)
+        if self._trigram_log is not None:
+            self._trigram_log.append((False, event))
+
+    def get_event(self, event_id):
+        """(дата, событие) по id за O(1) или None"""
+        return self.storage.get(event_id)
+
+    def get_events(self, event_ids):
+        """{id: (дата, событие)} для найденных в расписании id"""
+        with self._lock:
+            return self.storage.get_many(event_ids)
+
+    def add_event(self, date, start_time, end_time, theme, color, description, event_id=None):
+        event = Event(event_id or new_event_id(), start_time, end_time, theme, color, description)
+        self._insert_event(date, event)
+        self._log({'op': 'add', 'date': date, 'event': event})
+
+    def add_events(self, events):
+        """Массово добавляет события: кортежи (date, start_time, end_time, theme,
+        color, description[, event_id]). Каждый день сливается с новыми событиями
+        один раз, журнал дописывается одной операцией. Возвращает созданные события."""
+        entries = []
+        for date, start_time, end_time, theme, color, description, *event_id in events:
+            event = Event(event_id[0] if event_id and event_id[0] else new_event_id(),
+                          start_time, end_time, theme, color, description)
+            entries.append((date, event))
+        with self._lock:
+            self.storage.insert_many(entries)
+            for date, event in entries:
+                self.themes.add(event['theme'], event['color'])
+                self._trigram_add(event)
+                self._touch(date)
+        self._log_many([{'op': 'add', 'date': date, 'event': event} for date, event in entries])
+        return [event for _, event in entries]
+
+    def delete_event(self, event_id):
+        """Удаляет событие по id и возвращает его (None, если такого нет)"""
+        found = self.storage.get(event_id)
+        if found is None:
+            return None
+        date, event = found
+        self._remove_event(date, event)
+        self._log({'op': 'delete', 'date': date, 'id': event_id})
+        return event
+
+    def edit_event(self, event_id, new_start_time, new_end_time, new_theme, new_color, new_description):
+        """Изменяет событие по id; дата и id события сохраняются"""
+        found = self.storage.get(event_id)
+        if found is None:
+            return None
+        date, old_event = found
+        extra = old_event.extra
+        if extra and new_theme != old_event.theme and extra.get('tag') == old_event.theme:
+            # Поле tag из Firestore повторяет тему: при переименовании оно
+            # меняется вместе с ней, а tag, отличный от темы, остаётся как был
+            extra = dict(extra, tag=new_theme)
+        self._remove_event(date, old_event)
+        event = Event(event_id, new_start_time, new_end_time, new_theme, new_color, new_description,
+                      extra, old_event.user_id)
+        self._insert_event(date, event)
+        # Правка — одна запись журнала, чтобы сбой не оставил её наполовину
+        self._log({'op': 'edit', 'date': date, 'id': event_id, 'event': event})
+        return event
+
+    def apply_record(self, record):
+        """Применяет запись журнала. Повторное применение ничего не меняет."""
+        event_id = record['id'] if 'id' in record else record['event']['id']
+        found = self.storage.get(event_id)
+        if found is not None:
+            self._remove_event(*found)
+        if record['op'] in ('add', 'edit'):
+            self._insert_event(record['date'], Event.from_dict(record['event']))
+
+    def find_overlaps(self, date, start_time, end_time, exclude_id=None):
+        """Все события дня date, пересекающиеся с интервалом start_time–end_time
+        ("HH:mm"), в порядке начала. Событие с id exclude_id не учитывается
+        (например, редактируемое)."""
+        events = self.storage.overlaps(date, parse_time(start_time), parse_time(end_time))
+        if exclude_id is None:
+            return events
+        return [event for event in events if event['id'] != exclude_id]
+
+    def get_themes(self):
+        """Все темы расписания в алфавитном порядке"""
+        return self.themes.themes()
 
     def get_schedule(self, date=None):
         if date:
-            return self.schedule.get(date, [])
-        return self.schedule
+            return self.storage.get_day(date)
+        return self.storage.view()
+
+    def get_range(self, start, end):
+        """События с датами от start до end включительно (строки "yyyy-MM-dd"):
+        список (дата, события), упорядоченный по дате"""
+        return self.storage.get_range(start, end)
+
+    def query(self, start=None, end=None, theme=None):
+        """События с датами от start до end включительно (строки "yyyy-MM-dd"),
+        при необходимости только с темой theme: список (дата, события)"""
+        return self.storage.query(start, end, theme)
+
+    def warm_up(self):
+        """Заранее загружает модель spacy в фоновом потоке"""
+        self.nlp.warm_up()
+
+    def is_search_ready(self):
+        """Готов ли поиск выполниться без ожидания загрузки модели"""
+        return self.nlp.is_loaded()
 
     def lemmatize_text(self, text):
+        lemmas = self.lemma_cache.get(text)
+        if lemmas is not None:
+            return lemmas
         # Обрабатываем текст с помощью spacy
-        doc = nlp(text)
+        doc = self.nlp(text)
         # Возвращаем леммы (нормализованные формы) слов в тексте
-        return ' '.join([token.lemma_ for token in doc])
+        lemmas = ' '.join([token.lemma_ for token in doc])
+        self.lemma_cache.put(text, lemmas)
+        return lemmas
+
+    def lemmatize_texts(self, texts, batch_size=LEMMATIZE_BATCH_SIZE, n_process=1, should_stop=None):
+        """Лемматизирует список текстов пакетами через nlp.pipe.
+
+        n_process > 1 распределяет работу по нескольким процессам, что
+        окупается только на больших объёмах (например, при первой загрузке).
+        should_stop проверяется после каждого пакета; если он вернул True,
+        результат — None (уже готовые леммы остаются в кэше).
+        """
+        results = {}
+        missing = []
+        for text in texts:
+            if text in results:
+                continue
+            lemmas = self.lemma_cache.get(text)
+            results[text] = lemmas
+            if lemmas is None:
+                missing.append(text)
+
+        if missing:
+            docs = self.nlp.get().pipe(missing, batch_size=batch_size, n_process=n_process)
+            for i, (text, doc) in enumerate(zip(missing, docs), 1):
+                lemmas = ' '.join([token.lemma_ for token in doc])
+                results[text] = lemmas
+                self.lemma_cache.put(text, lemmas)
+                if should_stop is not None and i % batch_size == 0 and should_stop():
+                    return None
+        return [results[text] for text in texts]
+
+    def update_search_index(self, n_process=1, should_stop=None, progress=None):
+        """Лемматизирует события, которых ещё нет в поисковом индексе.
+
+        Темы и описания обрабатываются одним пакетным проходом в текущем
+        процессе: поиск идёт из QThreadPool, где порождать процессы spacy
+        нельзя. Лемматизация идёт без блокировки, так что расписание можно
+        менять параллельно. Возвращает False, если индексацию прервал should_stop.
+        """
+        with self._lock:
+            entries = self.storage.unindexed_events()
+            generation, mutation_count = self._generation, self._mutation_count
+        if not entries:
+            return True
+        if progress is not None:
+            progress(f"Индексация событий: {len(entries)}...")
+        texts = []
+        for _, event in entries:
+            texts.append(event['theme'].lower())
+            texts.append(event['description'].lower())
+        lemmas = self.lemmatize_texts(texts, n_process=n_process, should_stop=should_stop)
+        if lemmas is None:
+            return False
+        indexed = [(date, event, lemmas[2 * i], lemmas[2 * i + 1]) for i, (date, event) in enumerate(entries)]
+        for start in range(0, len(indexed), SET_LEMMAS_CHUNK):
+            chunk = indexed[start:start + SET_LEMMAS_CHUNK]
+            with self._lock:
+                if self._generation == generation:
+                    if self._mutation_count != mutation_count:
+                        # Пока шла лемматизация, события менялись: в индекс попадают
+                        # только не изменившиеся, остальные останутся до следующего поиска
+                        chunk = [entry for entry in chunk
+                                 if self.storage.get(entry[1]['id']) == (entry[0], entry[1])]
+                    self.storage.set_lemmas(chunk)
+                    continue
+            # Расписание заменили целиком: индексируем заново, готовые леммы уже в кэше
+            return self.update_search_index(n_process, should_stop, progress)
+        return True
+
+    def rebuild_search_index(self, n_process=1):
+        """Заново строит поисковый индекс по всему расписанию.
+
+        n_process > 1 — единственный путь к многопроцессной лемматизации;
+        вызывать так можно только из главного потока (скрипт, первая загрузка),
+        не из QThreadPool.
+        """
+        with self._lock:
+            self.storage.reset_lemmas()
+        self.update_search_index(n_process)
+
+    def iter_search(self, search_term, batch_size=SEARCH_BATCH_SIZE, should_stop=None, progress=None):
+        """Ищет события и отдаёт найденные пакетами [(дата, событие)] по мере
+        нахождения. Подходит для фонового потока: расписание блокируется только
+        на время получения очередного пакета, should_stop прерывает поиск."""
+        # Новые и изменённые события попадают в индекс перед поиском
+        if not self.update_search_index(should_stop=should_stop, progress=progress):
+            return
+        # Лемматизируем только поисковый запрос, события уже в индексе
+        lemmatized_search_term = self.lemmatize_text(search_term.lower())
+        batches = self.storage.iter_search_lemmas(lemmatized_search_term, batch_size)
+        while should_stop is None or not should_stop():
+            with self._lock:
+                batch = next(batches, None)
+            if batch is None:
+                return
+            yield batch
 
     def search_events(self, search_term):
-        filtered_schedule = defaultdict(list)
-        # Лемматизируем поисковый запрос
+        # Новые и изменённые события попадают в индекс перед поиском
+        self.update_search_index()
+        # Лемматизируем только поисковый запрос, события уже в индексе
         lemmatized_search_term = self.lemmatize_text(search_term.lower())
+        with self._lock:
+            return self.storage.search_lemmas(lemmatized_search_term)
 
-        for date, events in self.schedule.items():
-            for event in events:
-                # Лемматизируем описание и тему события
-                lemmatized_theme = self.lemmatize_text(event['theme'].lower())
-                lemmatized_description = self.lemmatize_text(event['description'].lower())
-                # print(lemmatized_theme,lemmatized_description,lemmatized_search_term)
+    def fuzzy_search(self, search_term, limit=FUZZY_SEARCH_LIMIT):
+        """Нечёткий поиск по триграммам, устойчивый к опечаткам: до limit
+        событий [(дата, событие)], от самых похожих к менее похожим"""
+        index = self.ensure_trigram_index()
+        with self._lock:
+            keys = [key for _, key in index.search(search_term, limit)]
+            found = self.storage.get_many(keys)
+        return [found[key] for key in keys if key in found]
+
+    def prefix_keys(self, query_words):
+        """(state_token(), id событий, где каждое слово запроса — начало слова
+        темы или описания); состояние и id берутся согласованно"""
+        index = self.ensure_trigram_index()
+        with self._lock:
+            return (self._generation, self._mutation_count), index.prefix_keys(query_words)
+
+    def prefix_search(self, search_term):
+        """Поиск по мере ввода: события, где каждое слово запроса — начало
+        слова темы или описания, в хронологическом порядке"""
+        return self.typeahead.search(search_term)
 
-                # Ищем частичное совпадение с леммами
-                if (lemmatized_search_term in lemmatized_theme or
-                        lemmatized_search_term in lemmatized_description):
-                    filtered_schedule[date].append(event)
+    def ensure_trigram_index(self):
+        """Триграммный и префиксный индекс, построенный при первом обращении.
 
-        return filtered_schedule
+        Основная блокировка не держится во время построения: под ней берётся
+        только список событий (из SQLite они читаются порциями), а в конце
+        к новому индексу применяются изменения, сделанные за время построения.
+        Вызывать без удерживаемой блокировки расписания.
+        """
+        with self._lock:
+            if self.trigrams.built:
+                return self.trigrams
+        with self._trigram_build_lock:
+            while True:
+                with self._lock:
+                    if self.trigrams.built:
+                        return self.trigrams
+                    generation = self._generation
+                    self._trigram_log = []
+                    if self.storage.is_persistent:
+                        events = (event for _, day in self.storage.view().items() for event in day)
+                    else:
+                        # Копируются только ссылки: события неизменяемы
+                        events = [event for day in self.storage.view().values() for event in day]
+                index = TrigramIndex()
+                index.build(events)
+                with self._lock:
+                    log, self._trigram_log = self._trigram_log, None
+                    if self._generation != generation:
+                        # Расписание заменили целиком, пока строился индекс
+                        continue
+                    for added, event in log:
+                        if added:
+                            index.add(event)
+                        else:
+                            index.remove(event)
+                    self.trigrams = index
+                    return index
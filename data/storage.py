@@ -0,0 +1,566 @@
+import bisect
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from collections.abc import Mapping
+from itertools import groupby
+
+from data.event import Event
+from data.interval_tree import IntervalTree
+
+# Какое хранилище использовать: "memory" (schedule.json + журнал) или "sqlite"
+STORAGE_KIND = os.environ.get("CALENDAR_STORAGE", "memory")
+SQLITE_FILE = "schedule.db"
+
+# Сколько найденных событий отдавать за один пакет при потоковом поиске
+SEARCH_BATCH_SIZE = 500
+
+# Сколько строк SQLite читать за одно взятие блокировки
+FETCH_CHUNK = 1000
+
+# Сколько id подставлять в один запрос SQLite вида "id IN (...)"
+IDS_PER_QUERY = 500
+
+
+def start_minutes(event):
+    """Ключ сортировки событий дня: время начала в минутах"""
+    return event.start
+
+
+def create_storage(kind=None):
+    """Создаёт хранилище расписания по имени ("memory" или "sqlite")"""
+    kind = kind or STORAGE_KIND
+    if kind == "sqlite":
+        return SQLiteStorage(SQLITE_FILE)
+    return MemoryStorage()
+
+
+class MemoryStorage:
+    """Расписание целиком в памяти: дата -> список событий, отсортированный
+    по времени начала. Сохраняется снимком schedule.json и журналом."""
+
+    is_persistent = False
+
+    def __init__(self):
+        self.schedule = defaultdict(list)
+        # Отсортированный список дат, в которые есть события
+        self._dates = []
+        # id события -> (дата, событие) для поиска за O(1)
+        self._by_id = {}
+        # Дерево интервалов дня для поиска накладок (data.interval_tree):
+        # строится при первом запросе к дню и дальше обновляется
+        # при каждой вставке и удалении за O(log n)
+        self._intervals = {}
+        # Инвертированный индекс для поиска: лемма -> id событий.
+        # None, пока поиск ни разу не выполнялся.
+        self._lemma_index = None
+        # id события -> (дата, событие, леммы темы, леммы описания)
+        self._indexed_events = {}
+        # id события -> (дата, событие): добавлены после построения индекса
+        self._unindexed_events = {}
+
+    def view(self):
+        return self.schedule
+
+    def replace_all(self, data):
+        self.schedule = defaultdict(list, data)
+        self._dates = sorted(date for date, events in self.schedule.items() if events)
+        self._by_id = {event['id']: (date, event) for date, events in self.schedule.items() for event in events}
+        self._intervals = {}
+        self._lemma_index = None
+        self._indexed_events = {}
+        self._unindexed_events = {}
+
+    def get_day(self, date):
+        return self.schedule.get(date, [])
+
+    def get(self, event_id):
+        """(дата, событие) по id или None"""
+        return self._by_id.get(event_id)
+
+    def get_many(self, event_ids):
+        """{id: (дата, событие)} для тех id, которые есть в расписании"""
+        found = {}
+        for event_id in event_ids:
+            entry = self._by_id.get(event_id)
+            if entry is not None:
+                found[event_id] = entry
+        return found
+
+    def insert(self, date, event):
+        if not self.schedule.get(date):
+            bisect.insort(self._dates, date)
+        self._by_id[event['id']] = (date, event)
+        # День уже отсортирован: вставка двоичным поиском вместо пересортировки
+        bisect.insort(self.schedule[date], event, key=start_minutes)
+        tree = self._intervals.get(date)
+        if tree is not None:
+            tree.insert(event)
+        if self._lemma_index is not None:
+            self._unindexed_events[event['id']] = (date, event)
+
+    def insert_many(self, entries):
+        """Вставляет список (дата, событие): события группируются по дате,
+        сортируются и сливаются с уже отсортированным днём за один проход"""
+        by_date = defaultdict(list)
+        for date, event in entries:
+            by_date[date].append(event)
+        new_dates = []
+        for date, events in by_date.items():
+            events.sort(key=start_minutes)
+            day = self.schedule.get(date)
+            if day:
+                self.schedule[date] = list(heapq.merge(day, events, key=start_minutes))
+            else:
+                self.schedule[date] = events
+                new_dates.append(date)
+            tree = self._intervals.get(date)
+            for event in events:
+                if tree is not None:
+                    tree.insert(event)
+                self._by_id[event['id']] = (date, event)
+                if self._lemma_index is not None:
+                    self._unindexed_events[event['id']] = (date, event)
+        if new_dates:
+            new_dates.sort()
+            self._dates = list(heapq.merge(self._dates, new_dates))
+
+    def remove(self, date, event):
+        events = self.schedule.get(date, [])
+        # События дня отсортированы по началу: ищем двоичным поиском,
+        # дальше перебираются только события с тем же временем начала
+        i = bisect.bisect_left(events, event.start, key=start_minutes)
+        while i < len(events) and events[i].start == event.start:
+            if events[i]['id'] == event['id']:
+                del events[i]
+                break
+            i += 1
+        self._by_id.pop(event['id'], None)
+        tree = self._intervals.get(date)
+        if tree is not None:
+            tree.remove(event)
+        if not events and date in self.schedule:
+            del self.schedule[date]
+            self._intervals.pop(date, None)
+            i = bisect.bisect_left(self._dates, date)
+            if i < len(self._dates) and self._dates[i] == date:
+                del self._dates[i]
+        self._unindexed_events.pop(event['id'], None)
+        self._unindex(event['id'])
+
+    def get_range(self, start=None, end=None):
+        """События с датами в [start, end] (включительно), по дням.
+
+        Границы ищутся двоичным поиском по отсортированному списку дат,
+        поэтому стоимость зависит от числа найденных дней, а не от всей истории.
+        """
+        lo = 0 if start is None else bisect.bisect_left(self._dates, start)
+        hi = len(self._dates) if end is None else bisect.bisect_right(self._dates, end)
+        return [(date, self.schedule[date]) for date in self._dates[lo:hi]]
+
+    def query(self, start=None, end=None, theme=None):
+        """То же, что get_range, но с фильтром по теме"""
+        result = self.get_range(start, end)
+        if theme is None:
+            return result
+        filtered = []
+        for date, events in result:
+            events = [event for event in events if event['theme'] == theme]
+            if events:
+                filtered.append((date, events))
+        return filtered
+
+    def overlaps(self, date, start, end):
+        """События дня, пересекающиеся с интервалом [start, end) в минутах,
+        в порядке начала. Дерево интервалов дня строится один раз за O(n log n)
+        и дальше поддерживается изменениями, запрос стоит O(log n + k)."""
+        tree = self._intervals.get(date)
+        if tree is None:
+            events = self.schedule.get(date)
+            if not events:
+                return []
+            tree = self._intervals[date] = IntervalTree(events)
+        return tree.overlaps(start, end)
+
+    # Поисковый индекс
+
+    def unindexed_events(self):
+        """События, которые ещё нужно лемматизировать: [(дата, событие)]"""
+        if self._lemma_index is None:
+            self._lemma_index = defaultdict(set)
+            # События остаются в очереди до set_lemmas: прерванная индексация
+            # продолжится при следующем поиске
+            self._unindexed_events = {event['id']: (date, event)
+                                      for date, events in self.schedule.items() for event in events}
+        return list(self._unindexed_events.values())
+
+    def set_lemmas(self, entries):
+        """Добавляет в индекс записи (дата, событие, леммы темы, леммы описания)"""
+        for date, event, lemmatized_theme, lemmatized_description in entries:
+            key = event['id']
+            self._unindexed_events.pop(key, None)
+            self._indexed_events[key] = (date, event, lemmatized_theme, lemmatized_description)
+            for lemma in set(lemmatized_theme.split()) | set(lemmatized_description.split()):
+                self._lemma_index[lemma].add(key)
+
+    def reset_lemmas(self):
+        self._lemma_index = None
+        self._indexed_events = {}
+        self._unindexed_events = {}
+
+    def _unindex(self, key):
+        entry = self._indexed_events.pop(key, None)
+        if entry is None:
+            return
+        _, _, lemmatized_theme, lemmatized_description = entry
+        for lemma in set(lemmatized_theme.split()) | set(lemmatized_description.split()):
+            keys = self._lemma_index.get(lemma)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._lemma_index[lemma]
+
+    def iter_search_lemmas(self, lemmatized_search_term, batch_size):
+        """Находит события по лемматизированному запросу и отдаёт их пакетами
+        [(дата, событие)] в произвольном порядке"""
+        # Кандидаты: события, у которых для каждой леммы запроса есть лемма,
+        # содержащая её (частичное совпадение)
+        candidates = None
+        for query_lemma in set(lemmatized_search_term.split()):
+            keys = set()
+            for lemma, lemma_keys in self._lemma_index.items():
+                if query_lemma in lemma:
+                    keys |= lemma_keys
+            candidates = keys if candidates is None else candidates & keys
+            if not candidates:
+                return
+        if candidates is None:
+            candidates = self._indexed_events.keys()
+
+        batch = []
+        for key in list(candidates):
+            entry = self._indexed_events.get(key)
+            if entry is None:
+                # Событие удалено, пока шёл поиск
+                continue
+            date, event, lemmatized_theme, lemmatized_description = entry
+            # Проверяем совпадение всей фразы запроса
+            if (lemmatized_search_term in lemmatized_theme or
+                    lemmatized_search_term in lemmatized_description):
+                batch.append((date, event))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def search_lemmas(self, lemmatized_search_term):
+        filtered_schedule = defaultdict(list)
+        for batch in self.iter_search_lemmas(lemmatized_search_term, SEARCH_BATCH_SIZE):
+            for date, event in batch:
+                filtered_schedule[date].append(event)
+        for events in filtered_schedule.values():
+            events.sort(key=start_minutes)
+        return defaultdict(list, sorted(filtered_schedule.items()))
+
+
+class SQLiteScheduleView(Mapping):
+    """Расписание из SQLite в виде словаря «дата -> события» без загрузки в память"""
+
+    def __init__(self, storage):
+        self._storage = storage
+
+    def __getitem__(self, date):
+        events = self._storage.get_day(date)
+        if not events:
+            raise KeyError(date)
+        return events
+
+    def __iter__(self):
+        return iter(self._storage.dates())
+
+    def __len__(self):
+        return self._storage.count_dates()
+
+    def __contains__(self, date):
+        return bool(self._storage.get_day(date))
+
+    def items(self):
+        return self._storage.iter_days()
+
+
+class SQLiteStorage:
+    """Расписание в базе SQLite с индексами по дате, теме и времени начала.
+
+    Диапазоны, фильтр по теме и поиск выполняются запросами к индексам,
+    поэтому в памяти держатся только результаты, а не всё расписание.
+    """
+
+    is_persistent = True
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id TEXT PRIMARY KEY,
+                    date TEXT NOT NULL,
+                    start_minute INTEGER NOT NULL,
+                    end_minute INTEGER NOT NULL,
+                    theme TEXT NOT NULL,
+                    color TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    extra TEXT,
+                    lemmas_theme TEXT,
+                    lemmas_description TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_events_date_start ON events(date, start_minute);
+                CREATE INDEX IF NOT EXISTS idx_events_theme ON events(theme, date);
+                CREATE INDEX IF NOT EXISTS idx_events_start ON events(start_minute);
+                CREATE INDEX IF NOT EXISTS idx_events_unindexed ON events(id) WHERE lemmas_theme IS NULL;
+
+                CREATE TABLE IF NOT EXISTS event_lemmas (
+                    lemma TEXT NOT NULL,
+                    event_id TEXT NOT NULL,
+                    PRIMARY KEY (lemma, event_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_event_lemmas_event ON event_lemmas(event_id);
+
+                CREATE TABLE IF NOT EXISTS lemma_vocabulary (
+                    lemma TEXT PRIMARY KEY
+                ) WITHOUT ROWID;
+            """)
+
+    @staticmethod
+    def _row_to_event(row):
+        start, end = row['start_minute'], row['end_minute']
+        user_id = None
+        extra = json.loads(row['extra']) if row['extra'] else None
+        if extra:
+            user_id = extra.pop('userId', None)
+            start = extra.pop('start_time', start)
+            end = extra.pop('end_time', end)
+        return Event(row['id'], start, end, row['theme'], row['color'], row['description'], extra, user_id)
+
+    @staticmethod
+    def _event_to_row(date, event):
+        # Время хранится в минутах от полуночи, как в Event: по нему сортируются
+        # события дня и ищутся накладки. Строка, которую нельзя записать
+        # как "HH:mm" (например, "9:00" из Firestore), хранится в extra,
+        # чтобы вернуть её без изменений.
+        extra = dict(event.extra) if event.extra else {}
+        if event.user_id is not None:
+            extra['userId'] = event.user_id
+        if event.raw_times is not None:
+            for key, raw in zip(('start_time', 'end_time'), event.raw_times):
+                if raw is not None:
+                    extra[key] = raw
+        return (event.id, date, event.start, event.end, event.theme, event.color, event.description,
+                json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    def _insert_rows(self, rows):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO events (id, date, start_minute, end_minute, theme, color, description, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def view(self):
+        return SQLiteScheduleView(self)
+
+    def replace_all(self, data):
+        """Заменяет расписание целиком. Леммы событий, у которых тема
+        и описание не изменились, сохраняются: после загрузки из Firestore
+        при каждом запуске заново лемматизируются только изменённые события."""
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS new_ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+            self._conn.execute("DELETE FROM new_ids")
+            self._conn.executemany("INSERT OR IGNORE INTO new_ids (id) VALUES (?)",
+                                   ((event['id'],) for events in data.values() for event in events))
+            self._conn.execute("DELETE FROM events WHERE id NOT IN (SELECT id FROM new_ids)")
+            self._conn.execute("DELETE FROM new_ids")
+            # В SET справа видны старые значения строки, поэтому сравнение
+            # тем и описаний идёт с тем, что было в базе
+            self._conn.executemany(
+                "INSERT INTO events (id, date, start_minute, end_minute, theme, color, description, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET date = excluded.date, start_minute = excluded.start_minute, "
+                "end_minute = excluded.end_minute, theme = excluded.theme, color = excluded.color, "
+                "description = excluded.description, extra = excluded.extra, "
+                "lemmas_theme = CASE WHEN events.theme = excluded.theme AND "
+                "events.description = excluded.description THEN events.lemmas_theme END, "
+                "lemmas_description = CASE WHEN events.theme = excluded.theme AND "
+                "events.description = excluded.description THEN events.lemmas_description END",
+                (self._event_to_row(date, event) for date, events in data.items() for event in events))
+            # Леммы удалённых и изменённых событий и слова, которых больше нет ни у одного события
+            self._conn.execute("DELETE FROM event_lemmas WHERE event_id NOT IN "
+                               "(SELECT id FROM events WHERE lemmas_theme IS NOT NULL)")
+            self._conn.execute("DELETE FROM lemma_vocabulary WHERE lemma NOT IN (SELECT lemma FROM event_lemmas)")
+
+    def get_day(self, date):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM events WHERE date = ? ORDER BY start_minute", (date,)).fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    def get(self, event_id):
+        """(дата, событие) по id или None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+        if row is None:
+            return None
+        return row['date'], self._row_to_event(row)
+
+    def get_many(self, event_ids):
+        """{id: (дата, событие)} для тех id, которые есть в базе"""
+        event_ids = list(event_ids)
+        found = {}
+        for i in range(0, len(event_ids), IDS_PER_QUERY):
+            chunk = event_ids[i:i + IDS_PER_QUERY]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM events WHERE id IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+            for row in rows:
+                found[row['id']] = (row['date'], self._row_to_event(row))
+        return found
+
+    def dates(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT date FROM events ORDER BY date")]
+
+    def count_dates(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT date) FROM events").fetchone()[0]
+
+    def _iter_chunks(self, sql, params=(), size=FETCH_CHUNK):
+        """Строки запроса порциями по size. Блокировка берётся на каждую
+        порцию, а не на весь запрос: GUI-поток (например, отрисовка
+        календаря через get_day) ждёт не дольше одной порции."""
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield rows
+
+    def iter_days(self):
+        """Поток (дата, события) по всему расписанию, день за днём"""
+        rows = (row for chunk in self._iter_chunks("SELECT * FROM events ORDER BY date, start_minute")
+                for row in chunk)
+        for date, day_rows in groupby(rows, key=lambda row: row['date']):
+            yield date, [self._row_to_event(row) for row in day_rows]
+
+    def insert(self, date, event):
+        with self._lock, self._conn:
+            # Леммы вставленного события будут посчитаны при следующем поиске
+            self._conn.execute("DELETE FROM event_lemmas WHERE event_id = ?", (event['id'],))
+            self._insert_rows([self._event_to_row(date, event)])
+
+    def insert_many(self, entries):
+        """Вставляет список (дата, событие) одной транзакцией"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM event_lemmas WHERE event_id = ?",
+                                   ((event['id'],) for _, event in entries))
+            self._insert_rows([self._event_to_row(date, event) for date, event in entries])
+
+    def remove(self, date, event):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM events WHERE id = ?", (event['id'],))
+            self._conn.execute("DELETE FROM event_lemmas WHERE event_id = ?", (event['id'],))
+
+    def get_range(self, start=None, end=None):
+        return self.query(start, end)
+
+    def query(self, start=None, end=None, theme=None):
+        """События с датами в [start, end] (включительно), по дням, с фильтром по теме"""
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(end)
+        if theme is not None:
+            conditions.append("theme = ?")
+            params.append(theme)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM events {where} ORDER BY date, start_minute", params).fetchall()
+        return [(date, [self._row_to_event(row) for row in day_rows])
+                for date, day_rows in groupby(rows, key=lambda row: row['date'])]
+
+    def overlaps(self, date, start, end):
+        """События дня, пересекающиеся с интервалом [start, end) в минутах"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM events WHERE date = ? AND start_minute < ? AND end_minute > ? "
+                "ORDER BY start_minute", (date, end, start)).fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    # Поисковый индекс хранится в базе и переживает перезапуск
+
+    def unindexed_events(self):
+        return [(row['date'], self._row_to_event(row))
+                for chunk in self._iter_chunks("SELECT * FROM events WHERE lemmas_theme IS NULL")
+                for row in chunk]
+
+    def set_lemmas(self, entries):
+        with self._lock, self._conn:
+            for date, event, lemmatized_theme, lemmatized_description in entries:
+                self._conn.execute(
+                    "UPDATE events SET lemmas_theme = ?, lemmas_description = ? WHERE id = ?",
+                    (lemmatized_theme, lemmatized_description, event['id']))
+                lemmas = set(lemmatized_theme.split()) | set(lemmatized_description.split())
+                self._conn.executemany("INSERT OR IGNORE INTO event_lemmas (lemma, event_id) VALUES (?, ?)",
+                                       [(lemma, event['id']) for lemma in lemmas])
+                self._conn.executemany("INSERT OR IGNORE INTO lemma_vocabulary (lemma) VALUES (?)",
+                                       [(lemma,) for lemma in lemmas])
+
+    def reset_lemmas(self):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE events SET lemmas_theme = NULL, lemmas_description = NULL")
+            self._conn.execute("DELETE FROM event_lemmas")
+            self._conn.execute("DELETE FROM lemma_vocabulary")
+
+    def iter_search_lemmas(self, lemmatized_search_term, batch_size):
+        """Находит события по лемматизированному запросу и отдаёт их пакетами
+        [(дата, событие)] в произвольном порядке: без ORDER BY SQLite не
+        сортирует всю выборку при первом же шаге, и строки читаются порциями"""
+        # Для каждой леммы запроса — события, у которых есть содержащая её лемма;
+        # затем проверка всей фразы по сохранённым леммам события
+        conditions = ["(instr(lemmas_theme, ?) > 0 OR instr(lemmas_description, ?) > 0)"]
+        params = [lemmatized_search_term, lemmatized_search_term]
+        for query_lemma in set(lemmatized_search_term.split()):
+            conditions.append(
+                "id IN (SELECT event_id FROM event_lemmas WHERE lemma IN "
+                "(SELECT lemma FROM lemma_vocabulary WHERE instr(lemma, ?) > 0))")
+            params.append(query_lemma)
+        for rows in self._iter_chunks(f"SELECT * FROM events WHERE {' AND '.join(conditions)}",
+                                      params, batch_size):
+            yield [(row['date'], self._row_to_event(row)) for row in rows]
+
+    def search_lemmas(self, lemmatized_search_term):
+        filtered_schedule = defaultdict(list)
+        for batch in self.iter_search_lemmas(lemmatized_search_term, SEARCH_BATCH_SIZE):
+            for date, event in batch:
+                filtered_schedule[date].append(event)
+        for events in filtered_schedule.values():
+            events.sort(key=start_minutes)
+        return defaultdict(list, sorted(filtered_schedule.items()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,52 @@
+class ThemeCatalog:
+    """Каталог тем расписания: сколько событий у каждой темы и каким цветом
+    тема была отмечена последний раз.
+
+    ScheduleManager обновляет его при каждом изменении, поэтому диалогам не
+    нужно обходить всё расписание, чтобы заполнить список тем. Тема, у которой
+    не осталось событий, из каталога удаляется.
+    """
+
+    def __init__(self):
+        # тема -> [число событий, последний цвет]
+        self._themes = {}
+
+    def add(self, theme, color):
+        entry = self._themes.get(theme)
+        if entry is None:
+            self._themes[theme] = [1, color]
+        else:
+            entry[0] += 1
+            entry[1] = color
+
+    def remove(self, theme):
+        entry = self._themes.get(theme)
+        if entry is None:
+            return
+        entry[0] -= 1
+        if entry[0] <= 0:
+            del self._themes[theme]
+
+    def rebuild(self, events):
+        """Строит каталог заново по всем событиям расписания"""
+        self._themes = {}
+        for event in events:
+            self.add(event['theme'], event['color'])
+
+    def themes(self):
+        """Темы в алфавитном порядке"""
+        return sorted(self._themes)
+
+    def count(self, theme):
+        entry = self._themes.get(theme)
+        return entry[0] if entry else 0
+
+    def last_color(self, theme):
+        entry = self._themes.get(theme)
+        return entry[1] if entry else None
+
+    def __contains__(self, theme):
+        return theme in self._themes
+
+    def __len__(self):
+        return len(self._themes)
@@ -0,0 +1,167 @@
+import bisect
+import heapq
+import re
+from collections import defaultdict
+
+# Слова короче не ищутся нечётко: у них слишком мало триграмм
+MIN_WORD_LENGTH = 2
+# Минимальное сходство слова запроса и слова события (коэффициент Жаккара по триграммам)
+MIN_WORD_SIMILARITY = 0.25
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def split_words(text):
+    """Слова текста в нижнем регистре, «ё» приравнивается к «е»"""
+    return _WORD_RE.findall(text.lower().replace('ё', 'е'))
+
+
+def trigrams(word):
+    """Триграммы слова с отступами по краям, как в pg_trgm: «дом» -> «  д», « до», «дом», «ом »"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Индекс символьных триграмм по словам тем и описаний для нечёткого поиска.
+
+    Триграммы строятся по словарю (каждое различное слово — один раз), а не
+    по каждому событию: слово запроса с опечаткой сравнивается со словами
+    словаря, у которых есть общие триграммы, а id событий берутся из списков
+    слов; сами события индекс не хранит, их отдаёт хранилище. Отсортированный
+    список слов словаря служит префиксным индексом для поиска по мере ввода.
+    Индекс строится при первом поиске и дальше обновляется при каждом
+    изменении расписания.
+    """
+
+    def __init__(self):
+        self.built = False
+        # триграмма -> слова, в которых она есть
+        self._trigram_words = defaultdict(set)
+        # слово -> (число триграмм, id событий)
+        self._words = {}
+        # Слова словаря по алфавиту — префиксный индекс
+        self._sorted_words = []
+
+    def build(self, events):
+        """Строит индекс по событиям; сами события в индексе не хранятся"""
+        self._trigram_words = defaultdict(set)
+        self._words = {}
+        self.built = True
+        # Пока индекс строится, словарь сортируется один раз в конце
+        self._sorted_words = None
+        for event in events:
+            self.add(event)
+        self._sorted_words = sorted(self._words)
+
+    def clear(self):
+        self.__init__()
+
+    @staticmethod
+    def event_words(event):
+        """Слова темы и описания события, которые попадают в индекс"""
+        words = set(split_words(event['theme'])) | set(split_words(event['description']))
+        return {word for word in words if len(word) >= MIN_WORD_LENGTH}
+
+    def add(self, event):
+        if not self.built:
+            return
+        key = event['id']
+        for word in self.event_words(event):
+            entry = self._words.get(word)
+            if entry is None:
+                word_trigrams = trigrams(word)
+                entry = self._words[word] = (len(word_trigrams), set())
+                for trigram in word_trigrams:
+                    self._trigram_words[trigram].add(word)
+                if self._sorted_words is not None:
+                    bisect.insort(self._sorted_words, word)
+            entry[1].add(key)
+
+    def remove(self, event):
+        """Убирает событие из индекса; слова берутся из него же, поэтому
+        передаётся та же запись, что была добавлена"""
+        if not self.built:
+            return
+        key = event['id']
+        for word in self.event_words(event):
+            word_entry = self._words.get(word)
+            if word_entry is None:
+                continue
+            word_entry[1].discard(key)
+            if not word_entry[1]:
+                # Слово больше не встречается: убираем его из словаря
+                del self._words[word]
+                i = bisect.bisect_left(self._sorted_words, word)
+                if i < len(self._sorted_words) and self._sorted_words[i] == word:
+                    del self._sorted_words[i]
+                for trigram in trigrams(word):
+                    words = self._trigram_words.get(trigram)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self._trigram_words[trigram]
+
+    def similar_words(self, word, min_similarity=MIN_WORD_SIMILARITY):
+        """Слова словаря со сходством не ниже min_similarity: {слово: сходство}"""
+        query_trigrams = trigrams(word)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for candidate in self._trigram_words.get(trigram, ()):
+                shared[candidate] += 1
+        result = {}
+        for candidate, common in shared.items():
+            similarity = common / (len(query_trigrams) + self._words[candidate][0] - common)
+            if similarity >= min_similarity:
+                result[candidate] = similarity
+        return result
+
+    def search(self, text, limit, min_similarity=MIN_WORD_SIMILARITY):
+        """limit лучших событий для запроса: [(сходство, id события)] по убыванию сходства.
+
+        Сходство события — среднее по словам запроса лучшего сходства
+        со словами события. Лучшие события отбираются кучей (heapq.nlargest),
+        без сортировки всех кандидатов.
+        """
+        query_words = [word for word in split_words(text) if len(word) >= MIN_WORD_LENGTH]
+        if not query_words:
+            return []
+        scores = defaultdict(float)
+        for query_word in query_words:
+            best = {}
+            for word, similarity in self.similar_words(query_word, min_similarity).items():
+                for key in self._words[word][1]:
+                    if similarity > best.get(key, 0.0):
+                        best[key] = similarity
+            for key, similarity in best.items():
+                scores[key] += similarity
+        count = len(query_words)
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        result = []
+        for key, score in top:
+            score /= count
+            if score < min_similarity:
+                break
+            result.append((score, key))
+        return result
+
+    def words_with_prefix(self, prefix):
+        """Слова словаря, начинающиеся с prefix (двоичный поиск по отсортированному словарю)"""
+        words = self._sorted_words
+        i = bisect.bisect_left(words, prefix)
+        while i < len(words) and words[i].startswith(prefix):
+            yield words[i]
+            i += 1
+
+    def prefix_keys(self, query_words):
+        """id событий, в которых каждое слово запроса — начало какого-то слова события"""
+        candidates = None
+        # Длинные префиксы выбирают меньше событий, с них и начинаем
+        for query_word in sorted(set(query_words), key=len, reverse=True):
+            keys = set()
+            for word in self.words_with_prefix(query_word):
+                keys |= self._words[word][1]
+            candidates = keys if candidates is None else candidates & keys
+            if not candidates:
+                return set()
+        return candidates or set()
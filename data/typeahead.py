@@ -0,0 +1,87 @@
+import time
+from collections import deque
+
+from data.trigram_index import MIN_WORD_LENGTH, split_words
+
+# По скольким последним запросам считается статистика задержки
+LATENCY_WINDOW = 200
+
+
+class TypeaheadSearch:
+    """Поиск по мере ввода: каждое слово запроса — начало слова в теме или описании.
+
+    Слова ищутся по префиксному индексу (data.trigram_index.TrigramIndex)
+    через открытые методы ScheduleManager: prefix_keys, state_token, get_events.
+    Если новый запрос продолжает предыдущий, а расписание с тех пор не
+    менялось, уточняется прошлый результат, а не всё расписание.
+    """
+
+    def __init__(self, schedule_manager):
+        self.schedule_manager = schedule_manager
+        self._last_text = None
+        self._last_keys = None
+        self._last_results = []
+        self._last_state = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.refined = 0
+        self.full = 0
+
+    def search(self, text):
+        """События [(дата, событие)] в хронологическом порядке.
+
+        Возвращаемый список не изменяется: при уточнении он может вернуться снова.
+        """
+        started = time.perf_counter()
+        text = ' '.join(split_words(text))
+        query_words = [word for word in text.split() if len(word) >= MIN_WORD_LENGTH]
+        manager = self.schedule_manager
+        results = None
+        refine = bool(self._last_keys is not None and self._last_text and query_words and
+                      text.startswith(self._last_text))
+        if not query_words:
+            state, keys = manager.state_token(), set()
+        elif refine:
+            # Запрос дописали: проверяются только новые или удлинённые слова запроса
+            last_words = set(self._last_text.split())
+            new_words = [word for word in query_words if word not in last_words]
+            if new_words:
+                state, new_keys = manager.prefix_keys(new_words)
+            else:
+                state, new_keys = manager.state_token(), None
+            if state != self._last_state:
+                # Расписание менялось: прошлый результат устарел
+                refine = False
+            else:
+                keys = self._last_keys if new_keys is None else self._last_keys & new_keys
+                # Прошлый результат уже упорядочен: отбираем из него, не сортируя заново
+                if len(keys) == len(self._last_keys):
+                    results = self._last_results
+                else:
+                    results = [item for item in self._last_results if item[1].id in keys]
+                self.refined += 1
+        if query_words and not refine:
+            state, keys = manager.prefix_keys(query_words)
+            self.full += 1
+        if results is None:
+            results = list(manager.get_events(keys).values())
+            results.sort(key=lambda item: (item[0], item[1].start))
+        # Уточнять можно только результат непустого запроса
+        self._last_text = ' '.join(query_words) and text
+        self._last_keys, self._last_results, self._last_state = keys, results, state
+        self._latencies.append(time.perf_counter() - started)
+        return results
+
+    def stats(self):
+        """Задержка последних запросов (мс) и сколько из них уточняли прошлый результат"""
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return {'queries': 0, 'refined': self.refined, 'full': self.full,
+                    'avg_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'queries': len(latencies),
+            'refined': self.refined,
+            'full': self.full,
+            'avg_ms': sum(latencies) / len(latencies) * 1000,
+            'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+            'max_ms': latencies[-1] * 1000,
+        }
@@ -1,10 +1,73 @@
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
 from docx import Document
 from docx.shared import Pt, Inches
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.enum.table import WD_ALIGN_VERTICAL
 
+COLUMNS = [
+    ("Дата", None),
+    ("Время начала", 'start_time'),
+    ("Время окончания", 'end_time'),
+    ("Тема", 'theme'),
+    ("Описание", 'description'),
+]
+# Сколько строк таблицы собирать в памяти перед записью в архив
+ROWS_PER_CHUNK = 1000
+# Ширина столбцов python-docx хранит в EMU, а w:tcW задаётся в twips
+EMU_PER_TWIP = 635
+
+# Символы, недопустимые в XML 1.0 (кроме табуляции и переводов строк)
+_INVALID_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_TABLE_END = b'</w:tbl>'
+
+
+def _add_styles(doc):
+    """Стили заголовка и ячеек таблицы: оформление задаётся один раз, а не в каждой ячейке"""
+    header_style = doc.styles.add_style("Schedule Header", WD_STYLE_TYPE.PARAGRAPH)
+    header_style.base_style = doc.styles['Normal']
+    header_style.font.bold = True
+    header_style.font.size = Pt(11)
+    header_style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+    cell_style = doc.styles.add_style("Schedule Cell", WD_STYLE_TYPE.PARAGRAPH)
+    cell_style.base_style = doc.styles['Normal']
+    cell_style.font.size = Pt(10)
+    cell_style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    return header_style, cell_style
+
+
+def _cell_text_xml(text):
+    """Текст ячейки в виде содержимого w:r; переводы строк — w:br, как в python-docx"""
+    text = escape(_INVALID_XML_RE.sub('', text))
+    lines = text.split('\n')
+    return '<w:br/>'.join(f'<w:t xml:space="preserve">{line}</w:t>' for line in lines)
+
+
+def _iter_row_xml(schedule, cell_prefixes):
+    """XML строк таблицы (w:tr) для всех событий расписания по порядку дат"""
+    suffix = '</w:r></w:p></w:tc>'
+    for date, events in sorted(schedule.items()):
+        date_xml = cell_prefixes[0] + _cell_text_xml(date) + suffix
+        for event in events:
+            cells = [date_xml]
+            for prefix, (_, key) in zip(cell_prefixes[1:], COLUMNS[1:]):
+                cells.append(prefix + _cell_text_xml(event.get(key, "")) + suffix)
+            yield '<w:tr>' + ''.join(cells) + '</w:tr>'
+
 
 def export_schedule_to_docx(schedule, file_name):
+    """Выгружает расписание {дата: [события]} в таблицу DOCX.
+
+    python-docx строит только каркас документа: поля, заголовок, стили
+    и шапку таблицы. Строки событий собираются сразу в виде XML и пишутся
+    в word/document.xml архива порциями, без создания объектов ячеек
+    и без хранения всей таблицы в памяти.
+    """
     doc = Document()
 
     # Убираем отступы и маргиналы в документе
@@ -14,48 +77,47 @@ def export_schedule_to_docx(schedule, file_name):
     section.top_margin = Inches(0.5)  # Убираем верхний отступ
     section.bottom_margin = Inches(0.5)  # Убираем нижний отступ
 
+    header_style, cell_style = _add_styles(doc)
+
     # Добавляем заголовок
     doc.add_heading("Расписание", level=0)
 
     # Создаем таблицу с заголовками
-    table = doc.add_table(rows=1, cols=5)
+    table = doc.add_table(rows=1, cols=len(COLUMNS))
     table.style = 'Table Grid'  # Устанавливаем стиль таблицы (с рамками)
     table.autofit = False  # Отключаем авторазмеры колонок
 
-    # Настраиваем заголовки таблицы
-    headers = table.rows[0].cells
-    headers[0].text = "Дата"
-    headers[1].text = "Время начала"
-    headers[2].text = "Время окончания"
-    headers[3].text = "Тема"
-    headers[4].text = "Описание"
-
-    # Применяем стили к заголовкам
-    for cell in headers:
-        paragraph = cell.paragraphs[0]
-        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        run = paragraph.runs[0]
-        run.bold = True
-        run.font.size = Pt(11)
+    for cell, (title, _) in zip(table.rows[0].cells, COLUMNS):
+        cell.text = title
+        cell.paragraphs[0].style = header_style
         cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
 
-    # Добавляем данные в таблицу
-    for date, events in sorted(schedule.items()):
-        for event in events:
-            row_cells = table.add_row().cells
-            row_cells[0].text = date
-            row_cells[1].text = event.get('start_time', "")
-            row_cells[2].text = event.get('end_time', "")
-            row_cells[3].text = event.get('theme', "")
-            row_cells[4].text = event.get('description', "")
-
-            # Применяем стили к ячейкам
-            for cell in row_cells:
-                paragraph = cell.paragraphs[0]
-                paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                run = paragraph.runs[0]
-                run.font.size = Pt(10)
-                cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-    # Сохраняем документ
-    doc.save(file_name)
+    # Начало каждой ячейки строки: ширина столбца, выравнивание по вертикали и стиль абзаца
+    cell_prefixes = [
+        f'<w:tc><w:tcPr><w:tcW w:w="{column.width // EMU_PER_TWIP}" w:type="dxa"/><w:vAlign w:val="center"/></w:tcPr>'
+        f'<w:p><w:pPr><w:pStyle w:val="{cell_style.style_id}"/></w:pPr><w:r>'
+        for column in table.columns
+    ]
+
+    skeleton = io.BytesIO()
+    doc.save(skeleton)
+
+    # Таблица в документе одна: строки событий вставляются перед её закрывающим тегом
+    with zipfile.ZipFile(skeleton) as source, \
+            zipfile.ZipFile(file_name, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            data = source.read(info.filename)
+            if info.filename != 'word/document.xml':
+                target.writestr(info, data)
+                continue
+            head, tail = data.split(_TABLE_END, 1)
+            with target.open(info.filename, 'w', force_zip64=True) as stream:
+                stream.write(head)
+                chunk = []
+                for row in _iter_row_xml(schedule, cell_prefixes):
+                    chunk.append(row)
+                    if len(chunk) >= ROWS_PER_CHUNK:
+                        stream.write(''.join(chunk).encode('utf-8'))
+                        chunk = []
+                stream.write(''.join(chunk).encode('utf-8'))
+                stream.write(_TABLE_END + tail)
@@ -1,8 +1,16 @@
 import sys
 from PyQt5.QtWidgets import QApplication
+from utils.file_utils import set_offline_mode
+from data import storage
 from ui.main_window import ScheduleApp
 
 if __name__ == '__main__':
+    # --offline: работать только с локальным schedule.json, без Firebase
+    if '--offline' in sys.argv:
+        set_offline_mode(True)
+    # --sqlite: хранить расписание в schedule.db вместо schedule.json
+    if '--sqlite' in sys.argv:
+        storage.STORAGE_KIND = "sqlite"
     app = QApplication(sys.argv)
     window = ScheduleApp()
     window.show()
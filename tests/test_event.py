@@ -0,0 +1,59 @@
+import json
+import sys
+
+from data.event import Event, json_default, parse_time
+
+
+def make_event(start="09:00", end="10:30", **extra):
+    return Event.from_dict(dict({'id': "e1", 'start_time': start, 'end_time': end, 'theme': "Лекция",
+                                 'color': "#007aff", 'description': "Матанализ"}, **extra))
+
+
+def test_times_are_stored_as_minutes():
+    event = make_event()
+    assert (event.start, event.end) == (540, 630)
+    assert (event['start_time'], event['end_time']) == ("09:00", "10:30")
+
+
+def test_end_of_day_is_not_wrapped_to_midnight():
+    event = make_event("23:00", "24:00")
+    assert event.end == 24 * 60
+    assert event['end_time'] == "24:00"
+
+
+def test_unparsed_times_are_kept_as_is():
+    for value in ("", "9:00", "25:00", "10:75", "весь день"):
+        event = make_event(value, value)
+        assert event['start_time'] == value
+        assert event['end_time'] == value
+
+
+def test_parse_time_rejects_invalid_values():
+    for value in ("", "25:00", "10:60", "-1:00", "abc"):
+        try:
+            parse_time(value)
+        except ValueError:
+            continue
+        raise AssertionError(f"{value!r} принято как время")
+
+
+def test_user_id_has_own_slot_and_is_interned():
+    user_id = ''.join(["0Md4UBw1r3", "PmfsqXPM9QYHst1hd2"])
+    event = make_event(userId=user_id, tag="Лекция", allDay=False)
+    assert event.user_id is sys.intern(user_id)
+    assert event.extra == {'tag': "Лекция", 'allDay': False}
+    assert event['userId'] == user_id
+    assert len(event) == len(list(event)) == 9
+
+
+def test_round_trip_through_json_keeps_every_field():
+    original = {'id': "e1", 'start_time': "9:00", 'end_time': "", 'theme': "Лекция",
+                'color': "#007aff", 'description': "Матанализ", 'userId': "u1", 'endDate': "2024-01-02"}
+    event = Event.from_dict(original)
+    assert json.loads(json.dumps(event, default=json_default)) == original
+
+
+def test_to_dict_matches_mapping_view():
+    for event in (make_event(), make_event("9:00", "24:00", userId="u1", tag="Учёба")):
+        assert event.to_dict() == {key: event[key] for key in event}
+        assert dict(event.items()) == event.to_dict()
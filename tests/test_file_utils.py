@@ -0,0 +1,251 @@
+import os
+
+import pytest
+
+from data.schedule_manager import ScheduleManager
+from data.storage import SQLITE_FILE, SQLiteStorage
+from utils import file_utils
+from utils.local_firestore import LocalFirestoreClient
+
+
+class UnavailableFirestore:
+    """Клиент Firestore без сети: любое обращение — ошибка"""
+
+    def collection(self, name):
+        raise ConnectionError("Firestore недоступен")
+
+    def batch(self):
+        raise ConnectionError("Firestore недоступен")
+
+
+def remote_event(number, date="2024-03-01"):
+    return {
+        "startDate": date, "endDate": date,
+        "startTime": f"{8 + number % 10:02d}:00", "endTime": f"{9 + number % 10:02d}:00",
+        "title": "Лекция", "description": f"Событие {number}", "tag": "Лекция",
+        "color": "#007AFF", "allDay": False, "userId": "u1",
+    }
+
+
+def fill_remote(client, count):
+    events = client.collection("events")
+    for number in range(count):
+        events.document(f"doc{number}").set(remote_event(number))
+    client.reset_counts()
+
+
+def remote_ids(client):
+    return {doc.id for doc in client.collection("events").stream()}
+
+
+def local_ids(manager):
+    return {event['id'] for _, events in manager.get_schedule().items() for event in events}
+
+
+def start_session(client, storage=None):
+    """Запуск приложения: загрузка расписания с клиентом client"""
+    file_utils.set_firestore_client(client)
+    manager = ScheduleManager(storage)
+    errors = file_utils.load_schedule_from_file(manager)
+    return manager, errors
+
+
+def close_session(manager):
+    """Закрытие приложения: то же, что делает ui.save_worker.SaveThread"""
+    file_utils.write_local_schedule(manager.get_schedule(), manager.journal)
+    errors = file_utils.sync_schedule(manager.get_schedule(), manager.journal)
+    manager.journal.close()
+    return errors
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # schedule.json, журнал и метка пишутся в текущий каталог
+    monkeypatch.chdir(tmp_path)
+    file_utils.set_offline_mode(False)
+    yield tmp_path
+    file_utils.set_firestore_client(None)
+
+
+def test_failed_remote_load_does_not_wipe_firestore():
+    remote = LocalFirestoreClient()
+    fill_remote(remote, 5)
+
+    manager, errors = start_session(remote)
+    assert not errors and len(local_ids(manager)) == 5
+    assert close_session(manager) == []
+    # Ничего не менялось — нечего и отправлять
+    assert not os.path.exists(file_utils.PENDING_SYNC_FILE)
+
+    manager, errors = start_session(UnavailableFirestore())
+    assert errors
+    # Вместо пустого расписания — локальная копия
+    assert len(local_ids(manager)) == 5
+    assert close_session(manager) == []
+    assert not os.path.exists(file_utils.PENDING_SYNC_FILE)
+
+    manager, errors = start_session(remote)
+    assert not errors and len(local_ids(manager)) == 5
+    assert close_session(manager) == []
+    assert len(remote_ids(remote)) == 5
+    assert remote.counts['deletes'] == 0
+
+
+def test_close_without_changes_does_not_rewrite_snapshot():
+    remote = LocalFirestoreClient()
+    fill_remote(remote, 5)
+    manager, _ = start_session(remote)
+    snapshot = os.stat(file_utils.SCHEDULE_FILE)
+    assert close_session(manager) == []
+    # Снимок заменяется атомарно (новый файл), поэтому перезапись видна по inode
+    assert os.stat(file_utils.SCHEDULE_FILE).st_ino == snapshot.st_ino
+
+    manager, _ = start_session(remote)
+    manager.add_event("2024-03-02", "10:00", "11:00", "Встреча", "#fff", "Новое")
+    snapshot = os.stat(file_utils.SCHEDULE_FILE)
+    assert close_session(manager) == []
+    assert os.stat(file_utils.SCHEDULE_FILE).st_ino != snapshot.st_ino
+    assert not manager.journal.has_records()
+
+
+def test_changes_made_while_firestore_is_unavailable_are_sent_later():
+    remote = LocalFirestoreClient()
+    fill_remote(remote, 5)
+    manager, _ = start_session(remote)
+    close_session(manager)
+
+    manager, _ = start_session(UnavailableFirestore())
+    manager.add_event("2024-03-02", "10:00", "11:00", "Встреча", "#fff", "Офлайн")
+    # Локальная копия могла устареть, поэтому она не отправляется,
+    # а изменение ждёт в журнале
+    assert close_session(manager)
+    assert not os.path.exists(file_utils.PENDING_SYNC_FILE)
+    assert len(remote_ids(remote)) == 5
+
+    manager, _ = start_session(remote)
+    assert len(local_ids(manager)) == 6
+    assert close_session(manager) == []
+    assert remote_ids(remote) == local_ids(manager)
+    assert remote.counts['deletes'] == 0
+    assert not os.path.exists(file_utils.PENDING_SYNC_FILE)
+
+
+def test_stale_local_copy_does_not_delete_documents_of_other_clients():
+    remote = LocalFirestoreClient()
+    fill_remote(remote, 5)
+    manager, _ = start_session(remote)
+    close_session(manager)
+
+    # Без сети: изменение поверх локальной копии
+    manager, _ = start_session(UnavailableFirestore())
+    manager.add_event("2024-03-02", "10:00", "11:00", "Встреча", "#fff", "Офлайн", "mine")
+    close_session(manager)
+
+    # Тем временем другой клиент создаёт документ
+    remote.collection("events").document("foreign").set(remote_event(7))
+    remote.reset_counts()
+
+    # С сетью: Firestore и поверх него только изменение из журнала
+    manager, errors = start_session(remote)
+    assert not errors
+    assert local_ids(manager) == remote_ids(remote) | {"mine"}
+    assert close_session(manager) == []
+    assert remote.counts['deletes'] == 0
+    assert {"foreign", "mine"} <= remote_ids(remote)
+    assert len(remote_ids(remote)) == 7
+
+
+def test_nothing_loaded_keeps_changes_in_journal_only():
+    remote = LocalFirestoreClient()
+    fill_remote(remote, 5)
+
+    # Первый запуск без сети и без локальной копии: загрузить нечего
+    manager, errors = start_session(UnavailableFirestore())
+    assert errors and not local_ids(manager)
+    manager.add_event("2024-03-02", "10:00", "11:00", "Встреча", "#fff", "Без сети")
+    close_session(manager)
+    assert not os.path.exists(file_utils.SCHEDULE_FILE)
+    assert len(remote_ids(remote)) == 5
+
+    # Изменения из журнала применяются поверх Firestore, а не вместо него
+    manager, errors = start_session(remote)
+    assert not errors and len(local_ids(manager)) == 6
+    assert close_session(manager) == []
+    assert len(remote_ids(remote)) == 6
+    assert remote.counts['deletes'] == 0
+
+
+def test_sqlite_changes_made_without_firestore_are_replayed_over_it():
+    remote = LocalFirestoreClient()
+    fill_remote(remote, 3)
+
+    storage = SQLiteStorage(SQLITE_FILE)
+    manager, errors = start_session(UnavailableFirestore(), storage)
+    assert errors
+    manager.add_event("2024-03-02", "10:00", "11:00", "Встреча", "#fff", "Без сети", "mine")
+    assert close_session(manager)
+    storage.close()
+
+    # replace_all данными Firestore не теряет изменение: оно применяется из журнала
+    storage = SQLiteStorage(SQLITE_FILE)
+    manager, errors = start_session(remote, storage)
+    assert not errors
+    assert local_ids(manager) == {"doc0", "doc1", "doc2", "mine"}
+    assert close_session(manager) == []
+    assert remote_ids(remote) == {"doc0", "doc1", "doc2", "mine"}
+    storage.close()
+
+
+def test_sync_sends_only_changes_and_keeps_foreign_fields():
+    remote = LocalFirestoreClient()
+    events = remote.collection("events")
+    for number in range(1200):
+        # Документы другого клиента: свои tag, allDay, endDate и неизвестное приложению поле
+        events.document(f"doc{number}").set(dict(
+            remote_event(number), tag="Учёба", allDay=number % 2 == 0,
+            endDate="2024-03-02", reminder=15, startTime="9:00"))
+    remote.reset_counts()
+
+    manager, errors = start_session(remote)
+    assert not errors
+    assert remote.counts['reads'] == 1200
+
+    # Сохранение без изменений не пишет в Firestore ничего
+    remote.reset_counts()
+    assert close_session(manager) == []
+    assert remote.counts == {'reads': 0, 'writes': 0, 'deletes': 0, 'commits': 0}
+
+    manager, _ = start_session(remote)
+    remote.reset_counts()
+    manager.edit_event("doc1", "10:00", "11:00", "Лекция", "#007AFF", "Перенесено")
+    manager.delete_event("doc2")
+    manager.add_event("2024-03-05", "12:00", "13:00", "Встреча", "#fff", "Новое")
+    assert close_session(manager) == []
+    # Одно изменение, одно удаление и одно новое событие: по пакету на удаление и запись
+    assert remote.counts == {'reads': 0, 'writes': 2, 'deletes': 1, 'commits': 2}
+
+    edited = events.document("doc1").get().to_dict()
+    assert edited["description"] == "Перенесено" and edited["startTime"] == "10:00"
+    assert (edited["tag"], edited["allDay"], edited["endDate"], edited["reminder"], edited["userId"]) == \
+        ("Учёба", False, "2024-03-02", 15, "u1")
+    assert events.document("doc3").get().to_dict()["startTime"] == "9:00"
+
+
+def test_tag_follows_renamed_theme_unless_it_differs():
+    remote = LocalFirestoreClient()
+    events = remote.collection("events")
+    events.document("foreign").set(dict(remote_event(1), tag="Учёба"))
+
+    manager, _ = start_session(remote)
+    manager.add_event("2024-03-05", "12:00", "13:00", "Лекция", "#fff", "Из приложения", "mine")
+    assert close_session(manager) == []
+    assert events.document("mine").get().to_dict()["tag"] == "Лекция"
+
+    manager, _ = start_session(remote)
+    manager.edit_event("mine", "12:00", "13:00", "Семинар", "#fff", "Из приложения")
+    manager.edit_event("foreign", "09:00", "10:00", "Экзамен", "#007AFF", "Событие 1")
+    assert close_session(manager) == []
+    mine = events.document("mine").get().to_dict()
+    foreign = events.document("foreign").get().to_dict()
+    assert (mine["title"], mine["tag"]) == ("Семинар", "Семинар")
+    assert (foreign["title"], foreign["tag"]) == ("Экзамен", "Учёба")
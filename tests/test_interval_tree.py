@@ -0,0 +1,42 @@
+import random
+
+from data.event import Event
+from data.storage import MemoryStorage
+
+
+def make_event(number, start, end):
+    return Event(f"e{number}", start, end, "Лекция", "#007aff", "")
+
+
+def brute_force(events, start, end):
+    return sorted((event for event in events if event.start < end and event.end > start),
+                  key=lambda event: (event.start, event.id))
+
+
+def test_overlaps_stay_correct_while_day_changes():
+    rng = random.Random(7)
+    storage = MemoryStorage()
+    day = []
+    for number in range(400):
+        if day and rng.random() < 0.3:
+            event = day.pop(rng.randrange(len(day)))
+            storage.remove("2024-05-01", event)
+        else:
+            start = rng.randrange(0, 24 * 60)
+            event = make_event(number, start, min(24 * 60, start + rng.randrange(5, 240)))
+            day.append(event)
+            storage.insert("2024-05-01", event)
+        start = rng.randrange(0, 24 * 60)
+        end = start + rng.randrange(1, 120)
+        found = storage.overlaps("2024-05-01", start, end)
+        assert [event.id for event in found] == [event.id for event in brute_force(day, start, end)]
+
+
+def test_all_day_event_is_found_next_to_short_ones():
+    storage = MemoryStorage()
+    storage.insert_many([("2024-05-01", make_event(0, 0, 24 * 60))] +
+                        [("2024-05-01", make_event(i, i * 10, i * 10 + 5)) for i in range(1, 100)])
+    assert [event.id for event in storage.overlaps("2024-05-01", 500, 505)] == ["e0", "e50"]
+    storage.remove("2024-05-01", storage.get("e0")[1])
+    assert [event.id for event in storage.overlaps("2024-05-01", 500, 505)] == ["e50"]
+    assert storage.overlaps("2024-05-02", 0, 24 * 60) == []
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from data.journal import ScheduleJournal, write_json_atomic
+from data.schedule_manager import ScheduleManager
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "schedule.journal"), str(tmp_path / "schedule.json")
+
+
+def start(paths):
+    """Запуск: снимок, затем хвост журнала"""
+    journal_path, snapshot_path = paths
+    manager = ScheduleManager()
+    try:
+        with open(snapshot_path, encoding='utf-8') as f:
+            manager.set_schedule(json.load(f))
+    except FileNotFoundError:
+        pass
+    journal = ScheduleJournal(journal_path, snapshot_path)
+    journal.replay(manager)
+    manager.attach_journal(journal)
+    return manager
+
+
+def crash(manager, tail):
+    """Сбой посреди записи: на диске остаётся начало строки tail"""
+    manager.journal.close()
+    with open(manager.journal.path, 'ab') as f:
+        f.write(tail)
+
+
+def descriptions(manager):
+    return sorted(event['description'] for _, events in manager.get_schedule().items() for event in events)
+
+
+def add(manager, description):
+    manager.add_event("2024-03-01", "10:00", "11:00", "Лекция", "#fff", description)
+
+
+def test_replay_applies_records_after_snapshot(paths):
+    manager = start(paths)
+    add(manager, "первое")
+    manager.journal.compact(manager.get_schedule())
+    add(manager, "второе")
+    manager.journal.close()
+
+    assert descriptions(start(paths)) == ["второе", "первое"]
+
+
+def test_crash_loses_only_the_last_record_every_time(paths):
+    manager = start(paths)
+    add(manager, "до первого сбоя")
+    crash(manager, b'{"op":"add","da')
+
+    manager = start(paths)
+    assert descriptions(manager) == ["до первого сбоя"]
+    add(manager, "после первого сбоя")
+    crash(manager, '{"op":"add","event":{"description":"оборв'.encode()[:-1])
+
+    manager = start(paths)
+    assert descriptions(manager) == ["до первого сбоя", "после первого сбоя"]
+    assert manager.journal.record_count == 2
+
+
+def test_replay_truncates_the_broken_tail(paths):
+    journal_path, _ = paths
+    manager = start(paths)
+    add(manager, "цела")
+    crash(manager, b'{"op":"add","da')
+
+    start(paths).journal.close()
+    with open(journal_path, 'rb') as f:
+        lines = f.read().split(b"\n")
+    assert lines[-1] == b"" and len(lines) == 2
+    json.loads(lines[0])
+
+
+def test_records_glued_to_a_broken_line_are_recovered(paths):
+    # Журнал, испорченный до исправления: запись дописана в недописанную строку
+    journal_path, _ = paths
+    manager = start(paths)
+    add(manager, "первая")
+    add(manager, "вторая")
+    manager.journal.close()
+    with open(journal_path, 'rb') as f:
+        first, second = f.read().splitlines()
+    with open(journal_path, 'wb') as f:
+        f.write(first + b"\n" + b'{"op":"add","da' + second + b"\n" + second.replace(
+            "вторая".encode(), "третья".encode()).replace(b'"id":"', b'"id":"x') + b"\n")
+
+    assert descriptions(start(paths)) == ["первая", "третья"]
+
+
+def test_append_after_unterminated_record_starts_a_new_line(paths):
+    journal_path, _ = paths
+    manager = start(paths)
+    add(manager, "первая")
+    manager.journal.close()
+    with open(journal_path, 'rb') as f:
+        data = f.read()
+    with open(journal_path, 'wb') as f:
+        f.write(data.rstrip(b"\n"))
+
+    # Журнал подключён без replay (как к базе SQLite): дописывание не склеивает строки
+    journal = ScheduleJournal(journal_path, paths[1])
+    journal.append({'op': 'delete', 'date': "2024-03-01", 'id': "нет такого"})
+    journal.close()
+    with open(journal_path, 'rb') as f:
+        assert len(f.read().splitlines()) == 2
+
+
+def test_compaction_writes_snapshot_and_empties_journal(paths):
+    journal_path, snapshot_path = paths
+    manager = start(paths)
+    for number in range(5):
+        add(manager, f"событие {number}")
+    manager.journal.compact(manager.get_schedule())
+    manager.journal.close()
+
+    assert manager.journal.record_count == 0
+    with open(journal_path, 'rb') as f:
+        assert f.read() == b""
+    assert len(start(paths).get_schedule()["2024-03-01"]) == 5
+    write_json_atomic(snapshot_path, {})
+    assert descriptions(start(paths)) == []
@@ -0,0 +1,76 @@
+import threading
+
+import data.schedule_manager as schedule_manager_module
+from data.schedule_manager import ScheduleManager
+
+
+def lemmatize_without_model(manager, on_call=None):
+    """Леммы — сами тексты: поисковый индекс проверяется без модели spacy"""
+    def lemmatize_texts(texts, n_process=1, should_stop=None):
+        if on_call is not None:
+            on_call()
+        return list(texts)
+    manager.lemmatize_texts = lemmatize_texts
+    manager.lemmatize_text = lambda text: text
+
+
+def add_lectures(manager, count):
+    manager.add_events([("2024-05-01", f"{9 + i % 8:02d}:00", f"{10 + i % 8:02d}:00", "Лекция",
+                         "#007aff", f"тема {i}") for i in range(count)])
+
+
+def test_lemmas_are_applied_in_chunks_and_skip_changed_events(monkeypatch):
+    monkeypatch.setattr(schedule_manager_module, "SET_LEMMAS_CHUNK", 3)
+    manager = ScheduleManager()
+    add_lectures(manager, 10)
+    removed = manager.get_schedule("2024-05-01")[0]
+    lemmatize_without_model(manager, on_call=lambda: manager.delete_event(removed['id']))
+
+    assert manager.update_search_index()
+    found = [event['id'] for events in manager.search_events("лекция").values() for event in events]
+    assert len(found) == 9
+    assert removed['id'] not in found
+
+
+def test_indexing_restarts_when_schedule_is_replaced():
+    manager = ScheduleManager()
+    add_lectures(manager, 5)
+    calls = []
+
+    def replace_once():
+        calls.append(1)
+        if len(calls) == 1:
+            manager.set_schedule({"2024-06-01": [{'id': "new", 'start_time': "09:00", 'end_time': "10:00",
+                                                  'theme': "Семинар", 'color': "#007aff",
+                                                  'description': ""}]})
+    lemmatize_without_model(manager, on_call=replace_once)
+
+    assert manager.update_search_index()
+    assert len(calls) == 2
+    assert list(manager.search_events("семинар")) == ["2024-06-01"]
+    assert manager.search_events("лекция") == {}
+
+
+def test_trigram_index_is_built_without_blocking_changes(monkeypatch):
+    manager = ScheduleManager()
+    add_lectures(manager, 5)
+    first, second = manager.get_schedule("2024-05-01")[:2]
+    build = schedule_manager_module.TrigramIndex.build
+
+    def build_while_schedule_changes(index, events):
+        # Изменения из другого потока не должны ждать конца построения
+        def change():
+            manager.delete_event(first['id'])
+            manager.edit_event(second['id'], "12:00", "13:00", "Семинар", "#007aff", "алгебра")
+            manager.add_event("2024-05-02", "09:00", "10:00", "Экзамен", "#007aff", "геометрия", "exam")
+        thread = threading.Thread(target=change)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        build(index, events)
+    monkeypatch.setattr(schedule_manager_module.TrigramIndex, "build", build_while_schedule_changes)
+
+    assert [event['id'] for _, event in manager.prefix_search("алгеб")] == [second['id']]
+    assert [event['id'] for _, event in manager.prefix_search("геом")] == ["exam"]
+    assert len(manager.prefix_search("тема")) == 3
+    assert len(manager.prefix_search("лекция")) == 3
@@ -0,0 +1,97 @@
+import threading
+
+from data.schedule_manager import ScheduleManager
+from data.storage import SQLiteStorage
+
+
+def event(event_id, theme, description="", start="09:00"):
+    return {'id': event_id, 'start_time': start, 'end_time': "10:00", 'theme': theme,
+            'color': "#007aff", 'description': description}
+
+
+def lock_is_free(lock):
+    acquired = []
+
+    def try_lock():
+        if lock.acquire(blocking=False):
+            acquired.append(True)
+            lock.release()
+    thread = threading.Thread(target=try_lock)
+    thread.start()
+    thread.join()
+    return bool(acquired)
+
+
+def lemma_rows(storage):
+    return {row[0]: row[1] for row in storage._conn.execute("SELECT id, lemmas_theme FROM events")}
+
+
+def vocabulary(storage):
+    return {row[0] for row in storage._conn.execute("SELECT lemma FROM lemma_vocabulary")}
+
+
+def test_replace_all_keeps_lemmas_of_unchanged_events(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "schedule.db"))
+    manager = ScheduleManager(storage)
+    manager.set_schedule({"2024-05-01": [event("a", "Лекция"), event("b", "Семинар")],
+                          "2024-05-02": [event("c", "Экзамен")]})
+    storage.set_lemmas([(date, item, item['theme'].lower(), "") for date, item in storage.unindexed_events()])
+
+    # Повторная загрузка того же расписания (как при каждом запуске из Firestore):
+    # a не изменилось, у b новая тема, c удалено, d добавлено
+    manager.set_schedule({"2024-05-01": [event("a", "Лекция", start="11:00"), event("b", "Практика")],
+                          "2024-05-03": [event("d", "Зачёт")]})
+
+    assert lemma_rows(storage) == {"a": "лекция", "b": None, "d": None}
+    assert {item['id'] for _, item in storage.unindexed_events()} == {"b", "d"}
+    assert vocabulary(storage) == {"лекция"}
+    assert storage.get("a")[1]['start_time'] == "11:00"
+    storage.close()
+
+
+def test_fuzzy_and_prefix_search_resolve_events_from_sqlite(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "schedule.db"))
+    manager = ScheduleManager(storage)
+    manager.set_schedule({"2024-05-01": [event("a", "Лекция", "Математический анализ")],
+                          "2024-05-02": [event("b", "Семинар", "Линейная алгебра")]})
+
+    assert [item['id'] for _, item in manager.fuzzy_search("алгебро")] == ["b"]
+    assert [item['id'] for _, item in manager.prefix_search("мат ана")] == ["a"]
+
+    manager.delete_event("a")
+    assert manager.prefix_search("мат") == []
+    assert manager.get_events(["a", "b"]).keys() == {"b"}
+    storage.close()
+
+
+def test_sqlite_orders_and_overlaps_by_minutes_like_memory(tmp_path):
+    day = [event("a", "Лекция", start="9:00"), event("b", "Семинар", start="10:00")]
+    sqlite = SQLiteStorage(str(tmp_path / "schedule.db"))
+    managers = [ScheduleManager(), ScheduleManager(sqlite)]
+    for manager in managers:
+        manager.set_schedule({"2024-05-01": [dict(item) for item in day]})
+
+    for manager in managers:
+        assert [item['id'] for item in manager.get_schedule("2024-05-01")] == ["a", "b"]
+        assert [item['id'] for item in manager.find_overlaps("2024-05-01", "09:00", "09:15")] == ["a"]
+        # Строка из Firestore возвращается такой же, какой пришла
+        stored = manager.get_event("a")[1]
+        assert (stored.start, stored['start_time'], stored.extra) == (540, "9:00", None)
+    sqlite.close()
+
+
+def test_sqlite_search_reads_rows_in_chunks_without_holding_the_lock(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "schedule.db"))
+    manager = ScheduleManager(storage)
+    manager.set_schedule({f"2024-05-{day:02d}": [event(f"e{day}", "Лекция")] for day in range(1, 6)})
+    storage.set_lemmas([(date, item, "лекция", "") for date, item in storage.unindexed_events()])
+
+    sizes = []
+    for batch in storage.iter_search_lemmas("лекция", 2):
+        sizes.append(len(batch))
+        # Между порциями блокировка хранилища свободна: другой поток
+        # (отрисовка календаря) берёт её, не дожидаясь конца поиска
+        assert lock_is_free(storage._lock)
+    assert sizes == [2, 2, 1]
+    assert list(storage.search_lemmas("лекция")) == [f"2024-05-{day:02d}" for day in range(1, 6)]
+    storage.close()
@@ -0,0 +1,36 @@
+from data.schedule_manager import ScheduleManager
+
+
+def make_manager():
+    manager = ScheduleManager()
+    manager.add_event("2024-05-02", "09:00", "10:00", "Экзамен", "#007aff", "программирование", "b")
+    manager.add_event("2024-05-01", "09:00", "10:00", "Экзамен", "#007aff", "программа курса", "a")
+    manager.add_event("2024-05-01", "12:00", "13:00", "Лекция", "#007aff", "проект", "c")
+    return manager
+
+
+def ids(results):
+    return [event['id'] for _, event in results]
+
+
+def test_extended_query_refines_previous_result():
+    manager = make_manager()
+    typeahead = manager.typeahead
+
+    assert ids(typeahead.search("про")) == ["a", "c", "b"]
+    assert ids(typeahead.search("прог")) == ["a", "b"]
+    assert ids(typeahead.search("прог экз")) == ["a", "b"]
+    assert ids(typeahead.search("прог экз програм")) == ["a", "b"]
+    assert (typeahead.full, typeahead.refined) == (1, 3)
+
+
+def test_change_of_schedule_forces_full_search():
+    manager = make_manager()
+    typeahead = manager.typeahead
+
+    assert ids(typeahead.search("прог")) == ["a", "b"]
+    manager.delete_event("a")
+    manager.add_event("2024-05-03", "09:00", "10:00", "Зачёт", "#007aff", "прогулка", "d")
+    assert ids(typeahead.search("прогр")) == ["b"]
+    assert ids(typeahead.search("прог")) == ["b", "d"]
+    assert (typeahead.full, typeahead.refined) == (3, 0)
@@ -206,13 +206,10 @@ class AddEventDialog(QDialog):
         self.layout.addWidget(theme_label)
         self.theme_input.setEditable(True)
         self.theme_input.addColoredItem("", "white")
-        all_themes = set()
-        for date, events in self.schedule_manager.get_schedule().items():
-            for event in events:
-                all_themes.add(event['theme'])
+        # Темы берутся из каталога ScheduleManager, без обхода расписания
         palette = ["#FFFFFF"]
 
-        for i, theme in enumerate(sorted(all_themes)):
+        for i, theme in enumerate(self.schedule_manager.get_themes()):
             color = palette[i % len(palette)]
             self.theme_input.addColoredItem(theme, color)
 
@@ -295,18 +292,21 @@ class AddEventDialog(QDialog):
             QMessageBox.warning(self, "Ошибка", f"Ошибка в дате: {str(e)}")
             return
 
-        # Проверка на пересечения с другими событиями
-        for event in self.schedule_manager.get_schedule(date):
-            if not (end_time <= event['start_time'] or start_time >= event['end_time']):
-                reply = QMessageBox.question(
-                    self,
-                    "Накладка",
-                    f"Событие пересекается с '{event['description']}' "
-                    f"({event['start_time']} - {event['end_time']}). Добавить всё равно?",
-                    QMessageBox.Yes | QMessageBox.No
-                )
-                if reply == QMessageBox.No:
-                    return
+        # Проверка на пересечения с другими событиями: все накладки в одном окне
+        conflicts = self.schedule_manager.find_overlaps(date, start_time, end_time)
+        if conflicts:
+            conflict_lines = "\n".join(
+                f"• '{event['description']}' ({event['start_time']} - {event['end_time']})"
+                for event in conflicts
+            )
+            reply = QMessageBox.question(
+                self,
+                "Накладка",
+                f"Событие пересекается с:\n{conflict_lines}\n\nДобавить всё равно?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply == QMessageBox.No:
+                return
 
         # Добавление события в расписание
         self.schedule_manager.add_event(date, start_time, end_time, theme, color, description)
@@ -7,8 +7,18 @@ from PyQt5.QtCore import QTime
 from ui.add_event_dialog import ColorDelegate, CustomComboBox
 
 class EditEventDialog(QDialog):
-    def __init__(self, date, start_time, end_time, theme, color, description, schedule_manager):
+    def __init__(self, event_id, schedule_manager):
         super().__init__()
+        # Событие берётся по id, а не восстанавливается из текста ячеек таблицы
+        found = schedule_manager.get_event(event_id)
+        if found is None:
+            raise LookupError(f"Событие {event_id} не найдено в расписании")
+        date, event = found
+        start_time = event['start_time']
+        end_time = event['end_time']
+        theme = event['theme']
+        color = event['color']
+        description = event['description']
         self.new_color = color
         self.setStyleSheet("""
             QDialog {
@@ -69,6 +79,7 @@ class EditEventDialog(QDialog):
             }
         """)
 
+        self.event_id = event_id
         self.date = date
         self.start_time = start_time
         self.end_time = end_time
@@ -113,13 +124,10 @@ class EditEventDialog(QDialog):
         self.layout.addWidget(theme_label)
         self.theme_input.setEditable(True)
         self.theme_input.addColoredItem(self.theme, "white")
-        all_themes = set()
-        for date, events in self.schedule_manager.get_schedule().items():
-            for event in events:
-                all_themes.add(event['theme'])
+        # Темы берутся из каталога ScheduleManager, без обхода расписания
         palette = ["#FFFFFF"]
 
-        for i, theme in enumerate(sorted(all_themes)):
+        for i, theme in enumerate(self.schedule_manager.get_themes()):
             color = palette[i % len(palette)]
             self.theme_input.addColoredItem(theme, color)
 
@@ -201,24 +209,31 @@ class EditEventDialog(QDialog):
             QMessageBox.warning(self, "Ошибка", "Время начала должно быть раньше времени окончания!")
             return
 
-        # Проверка на пересечения с другими событиями
-        for event in self.schedule_manager.get_schedule(self.date):
-            if event['start_time'] != self.start_time or event['end_time'] != self.end_time or event['theme'] != self.theme or event['color'] != self.color or event['description'] != self.description:
-                if not (new_end_time <= event['start_time'] or new_start_time >= event['end_time']):
-                    reply = QMessageBox.question(
-                        self,
-                        "Накладка",
-                        f"Событие пересекается с '{event['description']}' "
-                        f"({event['start_time']} - {event['end_time']}). Сохранить изменения?",
-                        QMessageBox.Yes | QMessageBox.No
-                    )
-                    if reply == QMessageBox.No:
-                        return
-
-        self.schedule_manager.edit_event(
-            self.date, self.start_time, self.end_time, self.theme, self.color, self.description,
-            new_start_time, new_end_time, new_theme, new_color, new_description
+        # Проверка на пересечения с другими событиями (кроме редактируемого):
+        # все накладки в одном окне
+        conflicts = self.schedule_manager.find_overlaps(
+            self.date, new_start_time, new_end_time, exclude_id=self.event_id)
+        if conflicts:
+            conflict_lines = "\n".join(
+                f"• '{event['description']}' ({event['start_time']} - {event['end_time']})"
+                for event in conflicts
+            )
+            reply = QMessageBox.question(
+                self,
+                "Накладка",
+                f"Событие пересекается с:\n{conflict_lines}\n\nСохранить изменения?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply == QMessageBox.No:
+                return
+
+        edited = self.schedule_manager.edit_event(
+            self.event_id, new_start_time, new_end_time, new_theme, new_color, new_description
         )
+        if edited is None:
+            QMessageBox.warning(self, "Ошибка", "Событие уже удалено, изменения не сохранены.")
+            self.close()
+            return
         QMessageBox.information(self, "Успех", "Событие успешно обновлено.")
         self.close()
 
@@ -1,76 +1,173 @@
+import os
+import time
+
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
-    QPushButton, QLineEdit, QCalendarWidget, QTableWidget,
-    QTableWidgetItem, QMessageBox, QFileDialog
+    QPushButton, QLineEdit, QCalendarWidget, QTableView,
+    QMessageBox, QFileDialog, QProgressDialog
 )
-from PyQt5.QtCore import Qt, QDate, QRect
-from PyQt5.QtGui import QTextCharFormat, QBrush, QColor, QFont
-from data.schedule_manager import ScheduleManager
-from ui.add_event_dialog import AddEventDialog
+from PyQt5.QtCore import Qt, QDate, QRect, QTimer, QThreadPool
+from PyQt5.QtGui import QTextCharFormat, QBrush, QColor, QFont, QPainter, QPixmap
+from data.schedule_manager import ScheduleManager, SEARCH_LEMMAS, SEARCH_FUZZY, SEARCH_PREFIX
+from data.storage import create_storage
+from ui.add_event_dialog import AddEventDialog, CustomComboBox, ColorDelegate
 from ui.edit_event_dialog import EditEventDialog
 from ui.view_schedule_dialog import ViewScheduleDialog
+from ui.save_worker import SaveThread
+from ui.search_worker import SearchWorker
+from ui.schedule_table_model import ScheduleTableModel, resize_columns_to_sample
 from export.export_to_docx import export_schedule_to_docx
-from utils.file_utils import load_schedule_from_file, save_schedule_to_file
+from utils.file_utils import load_schedule_from_file
+
+# Печатать статистику отрисовки ячеек календаря (CALENDAR_PAINT_STATS=1)
+PAINT_STATS = os.environ.get("CALENDAR_PAINT_STATS") == "1"
+# Через сколько отрисованных ячеек печатать статистику (6 недель — 42 ячейки)
+PAINT_STATS_EVERY = 42 * 10
+# Сколько готовых изображений ячеек держать в кэше
+PIXMAP_CACHE_SIZE = 42 * 8
+# Пауза после последнего нажатия клавиши перед поиском по мере ввода, мс
+SEARCH_DEBOUNCE_MS = 250
+# Печатать задержку поиска по мере ввода (SEARCH_STATS=1)
+SEARCH_STATS = os.environ.get("SEARCH_STATS") == "1"
+
+SELECTED_BRUSH = QBrush(QColor(139, 93, 36))  # Цвет фона выделенной ячейки
+CELL_BRUSH = QBrush(QColor(240, 240, 240))  # Обычный фон
+OTHER_MONTH_COLOR = QColor(180, 180, 180)  # Дни предыдущего или следующего месяца
+
 
 class RoundedCalendar(QCalendarWidget):
     def __init__(self, schedule_manager, parent=None):
         super().__init__(parent)
         self.schedule_manager = schedule_manager
-
-    def paintCell(self, painter, rect, date):
-        if date == self.selectedDate():
-            painter.setBrush(QBrush(QColor(139, 93, 36)))  # Цвет фона выделенной ячейки
-        else:
-            painter.setBrush(QBrush(QColor(240, 240, 240)))  # Обычный фон
+        # Кэш раскладки меток по датам:
+        # дата -> (версия дня, размер ячейки, [(прямоугольник, кисть, радиус, текст)]).
+        # Прямоугольники заданы относительно левого верхнего угла ячейки.
+        self._layout_cache = {}
+        # Готовые изображения ячеек:
+        # (дата, выделена, в текущем месяце, ширина, высота, масштаб) -> (версия дня, QPixmap).
+        # Перерисовываются только ячейки, у которых изменилась версия дня.
+        self.use_pixmap_cache = True
+        self._pixmap_cache = {}
+        self.reset_paint_stats()
+
+    def reset_paint_stats(self):
+        self._paint_stats = {'cells': 0, 'total': 0.0, 'max': 0.0, 'layout_hits': 0, 'layout_misses': 0,
+                             'pixmap_hits': 0, 'pixmap_misses': 0}
+
+    def paint_stats(self):
+        """Стоимость отрисовки ячеек: число, среднее и максимум (мкс), попадания в кэш раскладки"""
+        stats = self._paint_stats
+        cells = stats['cells']
+        lookups = stats['layout_hits'] + stats['layout_misses']
+        return {
+            'cells': cells,
+            'avg_us': stats['total'] / cells * 1e6 if cells else 0.0,
+            'max_us': stats['max'] * 1e6,
+            'layout_hits': stats['layout_hits'],
+            'layout_misses': stats['layout_misses'],
+            'layout_hit_rate': stats['layout_hits'] / lookups if lookups else 0.0,
+            'pixmap_hits': stats['pixmap_hits'],
+            'pixmap_misses': stats['pixmap_misses'],
+        }
+
+    def _event_layout(self, key, rect):
+        """Метки событий дня key для ячейки размера rect, из кэша или заново"""
+        version = self.schedule_manager.day_version(key)
+        size = (rect.width(), rect.height())
+        cached = self._layout_cache.get(key)
+        if cached is not None and cached[0] == version and cached[1] == size:
+            self._paint_stats['layout_hits'] += 1
+            return cached[2]
+        self._paint_stats['layout_misses'] += 1
+
+        # События дня в хранилище уже отсортированы по времени начала
+        events = self.schedule_manager.get_schedule(key)
+        labels = []
+        if events:
+            # Вычисляем высоту одной «метки»
+            max_labels = len(events)
+            # Оставим место под номер, поэтому отступ сверху:
+            top_offset = 35
+            available_height = rect.height() - 20
+            label_height = min((available_height - (max_labels - 1) * 2) / max_labels, 14)
+            for idx, ev in enumerate(events):
+                y = top_offset + idx * (label_height + 2)
+                oval_rect = QRect(2, int(y), rect.width() - 4, int(label_height))
+                labels.append((oval_rect, QBrush(QColor(ev.get('color'))), label_height / 2, ev['description']))
+        self._layout_cache[key] = (version, size, labels)
+        return labels
+
+    def _draw_cell(self, painter, rect, date, key, selected, in_month):
+        painter.setBrush(SELECTED_BRUSH if selected else CELL_BRUSH)
 
         painter.setPen(Qt.NoPen)
         painter.drawRoundedRect(rect, 5, 5)  # Скругленные углы
 
-        if date.month() != self.monthShown():  # Дни предыдущего или следующего месяца
-            text_color = QColor(180, 180, 180)  # Более бледный цвет
+        if not in_month:  # Дни предыдущего или следующего месяца
+            text_color = OTHER_MONTH_COLOR  # Более бледный цвет
         elif date.dayOfWeek() in [6, 7]:  # Суббота и воскресенье
             text_color = Qt.red
         else:
-            text_color = Qt.black if date != self.selectedDate() else Qt.white
+            text_color = Qt.black if not selected else Qt.white
 
         painter.setPen(text_color)
         text_rect = QRect(rect.x() + 5, rect.y() + 10, rect.width() - 20, rect.height() - 18)
         painter.drawText(text_rect, Qt.AlignRight | Qt.AlignTop, str(date.day()))
 
-        # Получаем список событий на эту дату
-        key = date.toString("yyyy-MM-dd")
-        events = self.schedule_manager.get_schedule(key)
-        if not events:
-            return
-
-        # Сортируем по времени начала
-        from PyQt5.QtCore import QTime
-        events = sorted(events, key=lambda e: QTime.fromString(e['start_time'], "HH:mm"))
-
-        # Вычисляем высоту одной «метки»
-        max_labels = len(events)
-        # Оставим место под номер, поэтому отступ сверху:
-        top_offset = rect.y() + 35
-        available_height = rect.height() - 20
-        label_height = min((available_height - (max_labels - 1) * 2) / max_labels, 14)
+        # Метки событий на эту дату
+        labels = self._event_layout(key, rect)
+        if labels:
+            painter.save()
+            painter.translate(rect.topLeft())
+            for oval_rect, brush, radius, description in labels:
+                painter.setBrush(brush)
+                painter.setPen(Qt.NoPen)
+                painter.drawRoundedRect(oval_rect, radius, radius)
+
+                # Рисуем текст описания события
+                painter.setPen(Qt.black)
+                painter.drawText(oval_rect.adjusted(4, 0, -4, 0), Qt.AlignLeft | Qt.AlignVCenter, description)
+            painter.restore()
 
-        for idx, ev in enumerate(events):
-            y = top_offset + idx * (label_height + 2)
-            oval_rect = QRect(rect.x() + 2, int(y), rect.width() - 4, int(label_height))
-
-            color = ev.get('color')
-
-            painter.setBrush(QBrush(QColor(color)))
-            painter.setPen(Qt.NoPen)
-            painter.drawRoundedRect(oval_rect, label_height / 2, label_height / 2)
+    def paintCell(self, painter, rect, date):
+        started = time.perf_counter()
+        key = date.toString("yyyy-MM-dd")
+        selected = date == self.selectedDate()
+        in_month = date.month() == self.monthShown()
+        if self.use_pixmap_cache:
+            version = self.schedule_manager.day_version(key)
+            ratio = self.devicePixelRatioF()
+            cache_key = (key, selected, in_month, rect.width(), rect.height(), ratio)
+            cached = self._pixmap_cache.get(cache_key)
+            if cached is not None and cached[0] == version:
+                self._paint_stats['pixmap_hits'] += 1
+                pixmap = cached[1]
+            else:
+                self._paint_stats['pixmap_misses'] += 1
+                pixmap = QPixmap(int(rect.width() * ratio), int(rect.height() * ratio))
+                pixmap.setDevicePixelRatio(ratio)
+                pixmap.fill(Qt.transparent)
+                cell_painter = QPainter(pixmap)
+                cell_painter.setFont(painter.font())
+                cell_painter.setRenderHints(painter.renderHints())
+                self._draw_cell(cell_painter, QRect(0, 0, rect.width(), rect.height()), date, key,
+                                selected, in_month)
+                cell_painter.end()
+                if cache_key not in self._pixmap_cache and len(self._pixmap_cache) >= PIXMAP_CACHE_SIZE:
+                    # Вытесняем самое старое изображение
+                    del self._pixmap_cache[next(iter(self._pixmap_cache))]
+                self._pixmap_cache[cache_key] = (version, pixmap)
+            painter.drawPixmap(rect.topLeft(), pixmap)
+        else:
+            self._draw_cell(painter, rect, date, key, selected, in_month)
 
-            # Рисуем текст описания события
-            painter.setPen(Qt.black)
-            painter.drawText(
-                oval_rect.adjusted(4, 0, -4, 0),
-                Qt.AlignLeft | Qt.AlignVCenter,
-                ev['description']
-            )
+        elapsed = time.perf_counter() - started
+        stats = self._paint_stats
+        stats['cells'] += 1
+        stats['total'] += elapsed
+        stats['max'] = max(stats['max'], elapsed)
+        if PAINT_STATS and stats['cells'] % PAINT_STATS_EVERY == 0:
+            print(f"Отрисовка календаря: {self.paint_stats()}")
 
 class ScheduleApp(QMainWindow):
     def __init__(self):
@@ -78,7 +175,7 @@ class ScheduleApp(QMainWindow):
         self.setWindowTitle("Планировщик расписания")
         self.setGeometry(100, 100, 1000, 800)
 
-        self.schedule_manager = ScheduleManager()
+        self.schedule_manager = ScheduleManager(storage=create_storage())
 
         self.main_widget = QWidget()
         self.setCentralWidget(self.main_widget)
@@ -243,11 +340,15 @@ class ScheduleApp(QMainWindow):
         self.hidden_frame.setLayout(self.hidden_layout)
         self.layout.addWidget(self.hidden_frame)
 
-        self.event_table = QTableWidget()
-        self.event_table.setColumnCount(6)
-        self.event_table.setHorizontalHeaderLabels(["Дата", "Начало", "Конец", "Тема", "Цвет", "Описание"])
+        self.event_table = QTableView()
+        # Строки создаются моделью только для видимой части таблицы
+        self.event_model = ScheduleTableModel([
+            ("Дата", 'date'), ("Начало", 'start_time'), ("Конец", 'end_time'),
+            ("Тема", 'theme'), ("Цвет", 'color'), ("Описание", 'description'),
+        ], self)
+        self.event_table.setModel(self.event_model)
         self.event_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: 1px solid #ddd;
                 font-size: 14px;
                 background-color: rgb(230, 224, 200);
@@ -259,17 +360,17 @@ class ScheduleApp(QMainWindow):
             QTableCornerButton::section {
                 background-color: rgb(230, 224, 200);
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 10px;
                 outline: 0px;
             }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #f1f1f1;
                 padding: 10px;
                 border-radius: 5px;
                 outline: 0px;
             }
-            QTableWidget::item:selected:enabled {
+            QTableView::item:selected:enabled {
                 background-color: #f1f1f1;
                 padding: 10px;
                 border-radius: 5px;
@@ -277,7 +378,7 @@ class ScheduleApp(QMainWindow):
                 color: black;
                 border: none;
             }
-            QTableWidget::item:selected:disabled {
+            QTableView::item:selected:disabled {
                 outline: 5px;
                 border: none;
             }
@@ -350,6 +451,15 @@ class ScheduleApp(QMainWindow):
             "background-color: rgb(230, 224, 200); font-size: 14px; padding: 8px; border-radius: 5px;")
         self.search_layout.addWidget(self.search_input)
 
+        # Режим поиска: по леммам или нечёткий, с опечатками
+        self.search_mode_input = CustomComboBox()
+        self.search_mode_input.setItemDelegate(ColorDelegate())
+        self.search_mode_input.addColoredItem("По словам", "rgb(230, 224, 200)")
+        self.search_mode_input.setItemData(0, SEARCH_LEMMAS, Qt.UserRole + 1)
+        self.search_mode_input.addColoredItem("С опечатками", "rgb(230, 224, 200)")
+        self.search_mode_input.setItemData(1, SEARCH_FUZZY, Qt.UserRole + 1)
+        self.search_layout.addWidget(self.search_mode_input)
+
         self.search_button = QPushButton("Поиск")
         self.search_button.setStyleSheet("""
             QPushButton {
@@ -367,68 +477,123 @@ class ScheduleApp(QMainWindow):
         self.search_layout.addWidget(self.search_button)
         self.search_input.returnPressed.connect(self.search_button.click)
 
-        self.calendar.selectionChanged.connect(self.add_event_dots)
+        # Поиск выполняется в фоне; номер запроса отсекает результаты отменённых
+        self.search_pool = QThreadPool(self)
+        self._search_worker = None
+        self._search_request = 0
+        self._search_mode = SEARCH_LEMMAS
+        self._search_started = 0.0
+
+        # Поиск по мере ввода: запускается, когда пользователь перестал печатать
+        self.typeahead_timer = QTimer(self)
+        self.typeahead_timer.setSingleShot(True)
+        self.typeahead_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.typeahead_timer.timeout.connect(self.typeahead_search)
+        self.search_input.textChanged.connect(self.typeahead_timer.start)
+
+        # Формат дат с событиями; выделение пересчитывается только при смене
+        # страницы календаря, после изменений обновляется одна дата
+        self._event_date_format = QTextCharFormat()
+        font = QFont()
+        font.setBold(True)
+        self._event_date_format.setFont(font)
+        self._event_date_format.setFontUnderline(True)
         self.calendar.currentPageChanged.connect(self.add_event_dots)
 
         self.load_schedule_from_file()
         self.update_schedule_view()
         self.add_event_dots()
 
+        # Модель для поиска грузим в фоне, когда окно уже показано
+        QTimer.singleShot(0, self.schedule_manager.warm_up)
+
+        # Фоновое сохранение при закрытии окна
+        self.save_thread = None
+        self.save_progress = None
+        self._local_saved = False
+        self._sync_errors = []
+
     def toggle_hidden_frame(self):
         self.hidden_frame.setVisible(not self.hidden_frame.isVisible())
         self.toggle_button.setText("Отобразить события" if not self.hidden_frame.isVisible() else "Скрыть события")
 
+    def visible_range(self):
+        """Первая и последняя даты, которые может показывать страница календаря"""
+        first = QDate(self.calendar.yearShown(), self.calendar.monthShown(), 1)
+        # Сетка — 6 недель, начиная с недели перед первым числом месяца
+        return first.addDays(-7), first.addDays(42)
+
     def add_event_dots(self):
+        """Выделяет даты с событиями только на видимой странице календаря"""
         self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
-        text_format = QTextCharFormat()
-        font = QFont()
-        font.setBold(True)
-        text_format.setFont(font)
-        text_format.setFontUnderline(True)
-        for date_str in self.schedule_manager.get_schedule():
-            date = QDate.fromString(date_str, "yyyy-MM-dd")
-            if date.isValid():
-                self.calendar.setDateTextFormat(date, text_format)
+        start, end = self.visible_range()
+        for date_str, events in self.schedule_manager.get_range(start.toString("yyyy-MM-dd"),
+                                                                end.toString("yyyy-MM-dd")):
+            if events:
+                date = QDate.fromString(date_str, "yyyy-MM-dd")
+                if date.isValid():
+                    self.calendar.setDateTextFormat(date, self._event_date_format)
+
+    def update_event_dot(self, date_str):
+        """Обновляет выделение одной даты после изменения её событий"""
+        date = QDate.fromString(date_str, "yyyy-MM-dd")
+        start, end = self.visible_range()
+        if not date.isValid() or not start <= date <= end:
+            return
+        if self.schedule_manager.get_schedule(date_str):
+            self.calendar.setDateTextFormat(date, self._event_date_format)
+        else:
+            self.calendar.setDateTextFormat(date, QTextCharFormat())
 
     def load_schedule_from_file(self):
-        load_schedule_from_file(self.schedule_manager)
+        for error in load_schedule_from_file(self.schedule_manager):
+            QMessageBox.warning(self, "Ошибка", error)
 
     def show_add_event_dialog(self):
-        dialog = AddEventDialog(self.calendar.selectedDate().toString("yyyy-MM-dd"), self.schedule_manager)
+        date = self.calendar.selectedDate().toString("yyyy-MM-dd")
+        dialog = AddEventDialog(date, self.schedule_manager)
         dialog.exec()
         self.update_schedule_view()
-        self.add_event_dots()
+        self.update_event_dot(date)
+
+    def selected_event_id(self):
+        """id события в выбранной строке таблицы (None, если строка не выбрана)"""
+        index = self.event_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.event_model.event_id(index.row())
 
     def delete_event(self):
-        selected_row = self.event_table.currentRow()
-        if selected_row == -1:
+        event_id = self.selected_event_id()
+        if event_id is None:
             QMessageBox.warning(self, "Ошибка", "Пожалуйста, выберите событие для удаления.")
             return
-        date = self.event_table.item(selected_row, 0).text()
-        start_time = self.event_table.item(selected_row, 1).text()
-        end_time = self.event_table.item(selected_row, 2).text()
-        theme = self.event_table.item(selected_row, 3).text()
-        color = self.event_table.item(selected_row, 4).text()
-        description = self.event_table.item(selected_row, 5).text()
-        self.schedule_manager.delete_event(date, start_time, end_time, theme, color, description)
+        found = self.schedule_manager.get_event(event_id)
+        if found is None:
+            # Строка осталась от поиска, а событие уже удалено или заменено
+            QMessageBox.warning(self, "Ошибка", "Событие уже удалено.")
+            self.update_schedule_view()
+            return
+        date, _ = found
+        self.schedule_manager.delete_event(event_id)
         self.update_schedule_view()
-        self.add_event_dots()
+        self.update_event_dot(date)
 
     def edit_event(self):
-        selected_row = self.event_table.currentRow()
-        if selected_row == -1:
+        event_id = self.selected_event_id()
+        if event_id is None:
             QMessageBox.warning(self, "Ошибка", "Пожалуйста, выберите событие для редактирования.")
             return
-        date = self.event_table.item(selected_row, 0).text()
-        start_time = self.event_table.item(selected_row, 1).text()
-        end_time = self.event_table.item(selected_row, 2).text()
-        theme = self.event_table.item(selected_row, 3).text()
-        color = self.event_table.item(selected_row, 4).text()
-        description = self.event_table.item(selected_row, 5).text()
-        dialog = EditEventDialog(date, start_time, end_time, theme, color, description, self.schedule_manager)
+        found = self.schedule_manager.get_event(event_id)
+        if found is None:
+            QMessageBox.warning(self, "Ошибка", "Событие уже удалено.")
+            self.update_schedule_view()
+            return
+        date, _ = found
+        dialog = EditEventDialog(event_id, self.schedule_manager)
         dialog.exec()
         self.update_schedule_view()
-        self.add_event_dots()
+        self.update_event_dot(date)
 
     def show_view_schedule_dialog(self):
         dialog = ViewScheduleDialog(self.schedule_manager)
@@ -439,11 +604,77 @@ class ScheduleApp(QMainWindow):
         if not search_term:
             QMessageBox.warning(self, "Ошибка", "Введите текст для поиска.")
             return
-        filtered_schedule = self.schedule_manager.search_events(search_term)
-        self.update_schedule_view(filtered_schedule)
+        self.typeahead_timer.stop()
+        self._start_search(search_term, self.search_mode_input.currentData(Qt.UserRole + 1))
+
+    def typeahead_search(self):
+        search_term = self.search_input.text().strip().lower()
+        if not search_term:
+            # Строку поиска очистили: возвращаем события выбранного дня
+            self.update_schedule_view()
+            return
+        self._start_search(search_term, SEARCH_PREFIX)
+
+    def _start_search(self, search_term, mode):
+        # Новый запрос отменяет предыдущий; найденное приходит пакетами из пула потоков
+        self._cancel_search()
+        self._search_request += 1
+        self._search_mode = mode
+        self._search_started = time.perf_counter()
+        worker = SearchWorker(self.schedule_manager, search_term, self._search_request, mode)
+        worker.signals.progress.connect(self._on_search_progress)
+        worker.signals.batch.connect(self._on_search_batch)
+        worker.signals.finished.connect(self._on_search_finished)
+        worker.signals.failed.connect(self._on_search_failed)
+        self._search_worker = worker
+        self.event_model.set_schedule([])
+        self.statusBar().showMessage("Поиск...")
+        self.search_pool.start(worker)
+
+    def _cancel_search(self):
+        if self._search_worker is not None:
+            self._search_worker.cancel()
+            self._search_worker = None
+            self.statusBar().clearMessage()
+
+    def _on_search_progress(self, request_id, message):
+        if request_id == self._search_request and self._search_worker is not None:
+            self.statusBar().showMessage(message)
+
+    def _on_search_batch(self, request_id, batch):
+        if request_id != self._search_request or self._search_worker is None:
+            return
+        first_batch = self.event_model.rowCount() == 0
+        self.event_model.append_rows(batch)
+        if first_batch:
+            resize_columns_to_sample(self.event_table)
+
+    def _on_search_finished(self, request_id, found):
+        if request_id != self._search_request or self._search_worker is None:
+            return
+        self._search_worker = None
+        # Нечёткий поиск упорядочил события по сходству, поиск по мере ввода — по дате
+        if self._search_mode == SEARCH_LEMMAS:
+            self.event_model.sort_rows()
+        resize_columns_to_sample(self.event_table)
+        if self._search_mode == SEARCH_PREFIX:
+            elapsed = (time.perf_counter() - self._search_started) * 1000
+            self.statusBar().showMessage(f"Найдено событий: {found} ({elapsed:.0f} мс)", 5000)
+            if SEARCH_STATS:
+                print(f"Поиск по мере ввода: {elapsed:.1f} мс, {self.schedule_manager.typeahead.stats()}")
+        else:
+            self.statusBar().showMessage(f"Найдено событий: {found}", 5000)
+
+    def _on_search_failed(self, request_id, error):
+        if request_id != self._search_request or self._search_worker is None:
+            return
+        self._search_worker = None
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "Ошибка", f"Поиск не выполнен: {error}")
 
     def update_schedule_view(self, filtered_schedule=None):
-        self.event_table.setRowCount(0)
+        # Таблица переключается на другие данные: незавершённый поиск больше не нужен
+        self._cancel_search()
         if filtered_schedule is None:
             selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
             events = self.schedule_manager.get_schedule(selected_date)
@@ -457,17 +688,8 @@ class ScheduleApp(QMainWindow):
                 data = filtered_schedule.items()
             else:
                 return
-        for date, events in data:
-            for event in events:
-                row = self.event_table.rowCount()
-                self.event_table.insertRow(row)
-                self.event_table.setItem(row, 0, QTableWidgetItem(date))
-                self.event_table.setItem(row, 1, QTableWidgetItem(event['start_time']))
-                self.event_table.setItem(row, 2, QTableWidgetItem(event['end_time']))
-                self.event_table.setItem(row, 3, QTableWidgetItem(event['theme']))
-                self.event_table.setItem(row, 4, QTableWidgetItem(event['color']))
-                self.event_table.setItem(row, 5, QTableWidgetItem(event['description']))
-        self.event_table.resizeColumnsToContents()
+        self.event_model.set_schedule(data)
+        resize_columns_to_sample(self.event_table)
 
     def export_to_docx(self):
         if not self.schedule_manager.get_schedule():
@@ -482,12 +704,59 @@ class ScheduleApp(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить документ: {e}")
 
-    def save_schedule_to_file(self):
-        save_schedule_to_file(self.schedule_manager)
-
     def closeEvent(self, event):
-        self.save_schedule_to_file()
-        event.accept()
+        # Окно закрывается только после того, как расписание надёжно записано на диск
+        if self._local_saved:
+            event.accept()
+            return
+        event.ignore()
+        if self.save_thread is not None:
+            return
+        self._cancel_search()
+
+        self.save_progress = QProgressDialog("Сохранение расписания...", None, 0, 0, self)
+        self.save_progress.setCancelButton(None)
+        self.save_progress.setWindowTitle("Сохранение")
+        self.save_progress.setWindowModality(Qt.WindowModal)
+        self.save_progress.setMinimumDuration(0)
+        self.save_progress.show()
+
+        # Синхронизация с Firebase может продолжаться после закрытия окна,
+        # поэтому приложение завершается по окончании потока сохранения
+        QApplication.instance().setQuitOnLastWindowClosed(False)
+        self.save_thread = SaveThread(self.schedule_manager.get_schedule(),
+                                      self.schedule_manager.journal, self,
+                                      copy=not self.schedule_manager.storage.is_persistent)
+        self.save_thread.progress.connect(self.save_progress.setLabelText)
+        self.save_thread.local_saved.connect(self._on_local_saved)
+        self.save_thread.local_failed.connect(self._on_local_save_failed)
+        self.save_thread.sync_finished.connect(self._on_sync_finished)
+        self.save_thread.finished.connect(self._on_save_thread_finished)
+        self.save_thread.start()
+
+    def _on_local_saved(self):
+        self._local_saved = True
+        self.save_progress.close()
+        self.close()
+
+    def _on_local_save_failed(self, error):
+        self.save_progress.close()
+        QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить расписание: {error}")
+
+    def _on_sync_finished(self, errors):
+        # Показываются, когда поток завершится: quit() закрыл бы окно сообщения
+        self._sync_errors = errors
+
+    def _on_save_thread_finished(self):
+        self.save_thread = None
+        if self._local_saved:
+            if self._sync_errors:
+                # Окно уже закрыто, но о неотправленных изменениях нужно сказать
+                QMessageBox.warning(None, "Ошибка синхронизации", "\n".join(self._sync_errors))
+            QApplication.instance().quit()
+        else:
+            # Локальное сохранение не удалось — окно остаётся открытым
+            QApplication.instance().setQuitOnLastWindowClosed(True)
 
 if __name__ == '__main__':
     app = QApplication([])
@@ -0,0 +1,40 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from utils import file_utils
+
+
+class SaveThread(QThread):
+    """Сохраняет расписание в фоне: сначала надёжно на диск, затем в Firestore"""
+
+    progress = pyqtSignal(str)
+    local_saved = pyqtSignal()
+    local_failed = pyqtSignal(str)
+    sync_finished = pyqtSignal(list)
+
+    def __init__(self, schedule, journal=None, parent=None, copy=True):
+        super().__init__(parent)
+        # Журнал изменений сворачивается в сохраняемый снимок
+        self.journal = journal
+        if copy:
+            # Копия расписания в памяти: GUI-поток может продолжать работать
+            # с оригиналом. События (data.event.Event) неизменяемы, поэтому
+            # копируются только списки.
+            self.schedule = {date: list(events) for date, events in schedule.items()}
+        else:
+            # Расписание из SQLite читается из базы день за днём, без копии
+            self.schedule = schedule
+
+    def run(self):
+        self.progress.emit("Сохранение расписания на диск...")
+        try:
+            file_utils.write_local_schedule(self.schedule, self.journal)
+        except Exception as e:
+            self.local_failed.emit(str(e))
+            return
+        self.local_saved.emit()
+
+        if file_utils.offline_mode:
+            return
+        self.progress.emit("Синхронизация с Firebase...")
+        # Ошибки показывает окно (ScheduleApp._on_sync_finished)
+        self.sync_finished.emit(file_utils.sync_schedule(self.schedule, self.journal))
@@ -0,0 +1,105 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+# Сколько строк измерять при подборе ширины столбцов
+COLUMN_SAMPLE_ROWS = 200
+# Запас к ширине текста на отступы ячейки (padding в стилях таблиц)
+COLUMN_PADDING = 30
+
+
+class ScheduleTableModel(QAbstractTableModel):
+    """Модель таблицы событий поверх данных ScheduleManager.
+
+    Хранит только ссылки (дата, событие); текст ячеек запрашивается
+    представлением для видимых строк, поэтому 50 тысяч найденных событий
+    не создают 300 тысяч QTableWidgetItem. Столбцы — пары (заголовок, ключ),
+    где ключ 'date' означает дату, остальные — поля события.
+    """
+
+    def __init__(self, columns, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.rows = []
+
+    def set_schedule(self, days, theme=None):
+        """Показывает события из пар (дата, события), при необходимости только с темой theme"""
+        self.beginResetModel()
+        if theme is None:
+            self.rows = [(date, event) for date, events in days for event in events]
+        else:
+            self.rows = [(date, event) for date, events in days for event in events
+                         if event['theme'] == theme]
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        """Дописывает пары (дата, событие) в конец таблицы (потоковый поиск)"""
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def sort_rows(self):
+        """Упорядочивает строки по дате и времени начала.
+
+        Постоянные индексы (выбранная строка, текущая ячейка) переносятся
+        на новые позиции своих строк, поэтому выделение остаётся на том же событии.
+        """
+        self.layoutAboutToBeChanged.emit()
+        rows = self.rows
+        order = sorted(range(len(rows)), key=lambda i: (rows[i][0], rows[i][1].start))
+        new_positions = [0] * len(order)
+        for new_row, old_row in enumerate(order):
+            new_positions[old_row] = new_row
+        self.rows = [rows[i] for i in order]
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(
+            old_indexes, [self.index(new_positions[index.row()], index.column()) for index in old_indexes])
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def cell_text(self, row, column):
+        date, event = self.rows[row]
+        key = self.columns[column][1]
+        return date if key == 'date' else event[key]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.cell_text(index.row(), index.column())
+        if role == Qt.UserRole:
+            # id события — для удаления и правки
+            return self.rows[index.row()][1]['id']
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return section + 1
+
+    def event_id(self, row):
+        return self.rows[row][1]['id']
+
+
+def resize_columns_to_sample(view, sample_rows=COLUMN_SAMPLE_ROWS):
+    """Подбирает ширину столбцов по заголовку и равномерной выборке строк,
+    а не по всем ячейкам, как resizeColumnsToContents"""
+    model = view.model()
+    rows = model.rowCount()
+    step = max(1, rows // sample_rows)
+    sample = range(0, rows, step)
+    metrics = view.fontMetrics()
+    header_metrics = view.horizontalHeader().fontMetrics()
+    for column in range(model.columnCount()):
+        width = header_metrics.horizontalAdvance(model.headerData(column, Qt.Horizontal))
+        for row in sample:
+            width = max(width, metrics.horizontalAdvance(model.cell_text(row, column)))
+        view.setColumnWidth(column, width + COLUMN_PADDING)
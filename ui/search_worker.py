@@ -0,0 +1,77 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from data.schedule_manager import SEARCH_LEMMAS, SEARCH_FUZZY, SEARCH_PREFIX
+
+
+class SearchSignals(QObject):
+    """Сигналы поиска. Первый аргумент — номер запроса, чтобы окно
+    отбрасывало результаты уже отменённых запросов."""
+
+    progress = pyqtSignal(int, str)
+    batch = pyqtSignal(int, list)
+    finished = pyqtSignal(int, int)
+    failed = pyqtSignal(int, str)
+
+
+class SearchWorker(QRunnable):
+    """Ищет события в QThreadPool и отдаёт найденные пакетами по мере нахождения"""
+
+    def __init__(self, schedule_manager, search_term, request_id, mode=SEARCH_LEMMAS):
+        super().__init__()
+        self.schedule_manager = schedule_manager
+        self.search_term = search_term
+        self.request_id = request_id
+        # SEARCH_LEMMAS, SEARCH_FUZZY или SEARCH_PREFIX
+        self.mode = mode
+        self.signals = SearchSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        """Просит прервать поиск: проверяется между пакетами"""
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def _progress(self, message):
+        self.signals.progress.emit(self.request_id, message)
+
+    def run(self):
+        try:
+            if self.mode == SEARCH_FUZZY:
+                found = self._run_fuzzy()
+            elif self.mode == SEARCH_PREFIX:
+                found = self._run_prefix()
+            else:
+                found = self._run_lemmas()
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        if not self._cancelled:
+            self.signals.finished.emit(self.request_id, found)
+
+    def _run_fuzzy(self):
+        # Нечёткий поиск быстрый: лучшие совпадения приходят одним пакетом
+        self._progress("Нечёткий поиск...")
+        batch = self.schedule_manager.fuzzy_search(self.search_term)
+        if batch and not self._cancelled:
+            self.signals.batch.emit(self.request_id, batch)
+        return len(batch)
+
+    def _run_prefix(self):
+        # Поиск по мере ввода: результат уже упорядочен по дате и времени
+        batch = self.schedule_manager.prefix_search(self.search_term)
+        if batch and not self._cancelled:
+            self.signals.batch.emit(self.request_id, batch)
+        return len(batch)
+
+    def _run_lemmas(self):
+        if not self.schedule_manager.is_search_ready():
+            self._progress("Загрузка модели для поиска...")
+        found = 0
+        for batch in self.schedule_manager.iter_search(
+                self.search_term, should_stop=self.is_cancelled, progress=self._progress):
+            found += len(batch)
+            self.signals.batch.emit(self.request_id, batch)
+            self._progress(f"Найдено событий: {found}...")
+        return found
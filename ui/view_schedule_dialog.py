@@ -1,10 +1,11 @@
 from PyQt5.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QCalendarWidget, QTableWidget, QTableWidgetItem, QPushButton
+    QDialog, QVBoxLayout, QHBoxLayout, QCalendarWidget, QTableView, QPushButton
 )
 from PyQt5.QtCore import QDate, Qt, QRect
 from PyQt5.QtGui import QBrush, QColor, QFont
 
 from ui.add_event_dialog import CustomComboBox, ColorDelegate
+from ui.schedule_table_model import ScheduleTableModel, resize_columns_to_sample
 
 
 class RoundedCalendar(QCalendarWidget):
@@ -57,7 +58,7 @@ class ViewScheduleDialog(QDialog):
             QPushButton:hover {
                 background-color: rgb(62, 84, 7);
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #ddd;
                 font-size: 14px;
                 background-color: rgb(230, 224, 200);
@@ -69,17 +70,17 @@ class ViewScheduleDialog(QDialog):
             QTableCornerButton::section {
                 background-color: rgb(230, 224, 200);
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 10px;
                 outline: 0px;
             }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #f1f1f1;
                 padding: 10px;
                 border-radius: 5px;
                 outline: 0px;
             }
-            QTableWidget::item:selected:enabled {
+            QTableView::item:selected:enabled {
                 background-color: #f1f1f1;
                 padding: 10px;
                 border-radius: 5px;
@@ -293,13 +294,10 @@ class ViewScheduleDialog(QDialog):
         theme_filter_input = CustomComboBox()
         theme_filter_input.setItemDelegate(ColorDelegate())
         theme_filter_input.addColoredItem("Все темы", "white")
-        all_themes = set()
-        for date, events in self.schedule_manager.get_schedule().items():
-            for event in events:
-                all_themes.add(event['theme'])
+        # Темы берутся из каталога ScheduleManager, без обхода расписания
         palette = ["#FFFFFF"]
 
-        for i, theme in enumerate(sorted(all_themes)):
+        for i, theme in enumerate(self.schedule_manager.get_themes()):
             color = palette[i % len(palette)]
             theme_filter_input.addColoredItem(theme, color)
         v3_layout.addWidget(theme_filter_input)
@@ -319,11 +317,15 @@ class ViewScheduleDialog(QDialog):
                 """)
         self.layout.addWidget(filter_button)
 
-        schedule_table = QTableWidget()
-        schedule_table.setColumnCount(5)
-        schedule_table.setHorizontalHeaderLabels(["Дата", "Время начала", "Время окончания", "Тема", "Описание"])
+        schedule_table = QTableView()
+        # Строки создаются моделью только для видимой части таблицы
+        schedule_model = ScheduleTableModel([
+            ("Дата", 'date'), ("Время начала", 'start_time'), ("Время окончания", 'end_time'),
+            ("Тема", 'theme'), ("Описание", 'description'),
+        ], self)
+        schedule_table.setModel(schedule_model)
         schedule_table.setStyleSheet("""
-                    QTableWidget {
+                    QTableView {
                         border: 1px solid #ddd;
                         font-size: 14px;
                         background-color: rgb(230, 224, 200);
@@ -335,17 +337,17 @@ class ViewScheduleDialog(QDialog):
                     QTableCornerButton::section {
                         background-color: rgb(230, 224, 200); /* Цвет угловой кнопки */
                     }
-                    QTableWidget::item {
+                    QTableView::item {
                         padding: 10px;
                         outline: 0px;
                     }
-                    QTableWidget::item:hover {
+                    QTableView::item:hover {
                         background-color: #f1f1f1;
                         padding: 10px;
                         border-radius: 5px;
                         outline: 0px;
                     }
-                    QTableWidget::item:selected:enabled {
+                    QTableView::item:selected:enabled {
                         background-color: #f1f1f1;
                         padding: 10px;
                         border-radius: 5px;
@@ -353,7 +355,7 @@ class ViewScheduleDialog(QDialog):
                         color: black;
                         border: none;
                     }
-                    QTableWidget::item:selected:disabled {
+                    QTableView::item:selected:disabled {
                         outline: 5px;
                         border: none;
                     }
@@ -382,9 +384,7 @@ class ViewScheduleDialog(QDialog):
                 """)
         self.layout.addWidget(schedule_table)
 
-        def populate_table(filtered_schedule=None):
-            schedule_table.setRowCount(0)
-            data = self.schedule_manager.get_schedule().items() if filtered_schedule is None else filtered_schedule.items()
+        def selected_period():
             selected_start_date = start_date_input.selectedDate()
             selected_range = date_range_input.currentText()
             if selected_range == "1 неделя":
@@ -393,35 +393,22 @@ class ViewScheduleDialog(QDialog):
                 end_date = selected_start_date.addMonths(1)
             elif selected_range == "3 месяца":
                 end_date = selected_start_date.addMonths(3)
+            return selected_start_date.toString("yyyy-MM-dd"), end_date.toString("yyyy-MM-dd")
+
+        def populate_table(filtered_schedule=None):
             selected_theme = theme_filter_input.currentText()
-            for date, events in sorted(data):
-                row_date = QDate.fromString(date, "yyyy-MM-dd")
-                if selected_start_date <= row_date <= end_date:
-                    for event in sorted(events, key=lambda e: e['start_time']):
-                        if selected_theme == "Все темы" or event['theme'] == selected_theme:
-                            row = schedule_table.rowCount()
-                            schedule_table.insertRow(row)
-                            schedule_table.setItem(row, 0, QTableWidgetItem(date))
-                            schedule_table.setItem(row, 1, QTableWidgetItem(event['start_time']))
-                            schedule_table.setItem(row, 2, QTableWidgetItem(event['end_time']))
-                            schedule_table.setItem(row, 3, QTableWidgetItem(event['theme']))
-                            schedule_table.setItem(row, 4, QTableWidgetItem(event['description']))
+            theme = None if selected_theme == "Все темы" else selected_theme
+            if filtered_schedule is None:
+                # Даты в расписании — строки "yyyy-MM-dd", их порядок совпадает с хронологическим,
+                # поэтому нужный период выбирается двоичным поиском без разбора каждой даты
+                start, end = selected_period()
+                filtered_schedule = self.schedule_manager.query(start, end, theme)
+            schedule_model.set_schedule(filtered_schedule, theme)
+            resize_columns_to_sample(schedule_table)
 
         def apply_filter():
-            filtered_schedule = {}
-            selected_start_date = start_date_input.selectedDate().toString("yyyy-MM-dd")
-            selected_range = date_range_input.currentText()
-            if selected_range == "1 неделя":
-                end_date = start_date_input.selectedDate().addDays(7)
-            elif selected_range == "1 месяц":
-                end_date = start_date_input.selectedDate().addMonths(1)
-            elif selected_range == "3 месяца":
-                end_date = start_date_input.selectedDate().addMonths(3)
-            for date, events in self.schedule_manager.get_schedule().items():
-                row_date = QDate.fromString(date, "yyyy-MM-dd")
-                if start_date_input.selectedDate() <= row_date <= end_date:
-                    filtered_schedule[date] = events
-            populate_table(filtered_schedule)
+            start, end = selected_period()
+            populate_table(self.schedule_manager.get_range(start, end))
 
         filter_button.clicked.connect(apply_filter)
         populate_table()
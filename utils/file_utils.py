@@ -1,9 +1,10 @@
 import json
 import os
-from PyQt5.QtWidgets import QMessageBox
-from collections import defaultdict
-import firebase_admin
-from firebase_admin import credentials, firestore
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data.event import Event
+from data.journal import ScheduleJournal, write_json_atomic
 
 
 # Получаем путь к директории, где находится текущий скрипт
@@ -12,32 +13,97 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 # Формируем путь к файлу credentials относительно текущей директории
 cred_path = os.path.join(current_dir, "calendar-aip-kr-firebase-adminsdk-fbsvc-68c271d4af.json")
 
-cred = credentials.Certificate(cred_path)
+# Режим без Firebase: расписание хранится только в schedule.json.
+# Включается переменной окружения CALENDAR_OFFLINE=1 или set_offline_mode(True).
+offline_mode = os.environ.get("CALENDAR_OFFLINE", "") == "1"
+
+# Клиент Firestore создаётся при первой синхронизации, а не при импорте
+db = None
+
+# Firestore допускает не более 500 операций в одном batch
+BATCH_SIZE = 450
+# Сколько batch-ей коммитится одновременно
+COMMIT_WORKERS = 4
+# Сколько раз повторять batch, который не удалось закоммитить
+COMMIT_RETRIES = 3
+
+# Файл расписания и метка «локальные изменения ещё не отправлены в Firestore»
+SCHEDULE_FILE = "schedule.json"
+PENDING_SYNC_FILE = "schedule.json.pending"
+# Журнал изменений поверх снимка schedule.json
+JOURNAL_FILE = "schedule.journal"
+# Журнал при хранилище SQLite: база сама хранит каждое изменение, а журнал
+# сохраняет изменения сеансов без Firestore, чтобы применить их поверх него
+SQLITE_JOURNAL_FILE = "schedule_db.journal"
+
+# Поля документа Firestore, которые приложение показывает и изменяет
+# (id — это id документа)
+FIRESTORE_EVENT_FIELDS = ("id", "startDate", "startTime", "endTime", "title", "description", "color")
+
+# Последнее известное состояние коллекции events: id документа -> данные.
+# По нему вычисляется, какие документы нужно записать или удалить.
+synced_events = None
+
+# Итог загрузки при запуске (см. load_schedule_from_file).
+# sync_allowed снимается, если расписание загружено не из Firestore и не
+# поверх неотправленных изменений: такое состояние не отправляется в Firestore.
+# snapshot_allowed снимается, если расписание не загрузилось вовсе: неполные
+# данные не записываются поверх schedule.json, изменения остаются в журнале.
+sync_allowed = True
+snapshot_allowed = True
+
+
+def set_offline_mode(enabled):
+    """Включает или выключает работу без Firebase"""
+    global offline_mode
+    offline_mode = enabled
+
+
+def set_firestore_client(client):
+    """Подменяет клиент Firestore, например на utils.local_firestore.LocalFirestoreClient"""
+    global db, synced_events
+    db = client
+    synced_events = None
+
+
+def get_db():
+    """Возвращает клиент Firestore, инициализируя Firebase при первом вызове"""
+    global db
+    if db is None:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
 
-firebase_admin.initialize_app(cred, {
-    'projectId': 'calendar-aip-kr'
-})
+        try:
+            firebase_admin.get_app()
+        except ValueError:
+            cred = credentials.Certificate(cred_path)
+            firebase_admin.initialize_app(cred, {
+                'projectId': 'calendar-aip-kr'
+            })
 
-# Инициализация клиента Firestore
-db = firestore.client()
+        # Инициализация клиента Firestore
+        db = firestore.client()
+    return db
 
 
 def convert_from_firebase_format(firebase_events):
     """Преобразует данные из формата Firebase в промежуточный формат"""
     result = []
     for event in firebase_events:
-        result.append({
+        entry = {
             "description": event.get("description", ""),
-            "endDate": event.get("endDate", ""),
-            "tag": event.get("tag", ""),
             "endTime": event.get("endTime", ""),
-            "userId": event.get("userId", ""),
-            "allDay": event.get("allDay", False),
             "title": event.get("title", ""),
             "startTime": event.get("startTime", ""),
             "color": event.get("color", "#007AFF"),
-            "startDate": event.get("startDate", "")
-        })
+            "startDate": event.get("startDate", ""),
+            "id": event.get("id", "")
+        }
+        # Остальные поля документа (userId, tag, allDay, endDate и поля других
+        # клиентов) переносятся как есть, чтобы записать их обратно без изменений
+        for key, value in event.items():
+            entry.setdefault(key, value)
+        result.append(entry)
     return result
 
 
@@ -55,15 +121,17 @@ def convert_to_final_format(intermediate_data):
         if event["color"] not in color_list:
             color_list.append(event["color"])
 
-        # Создаем запись события
-        event_entry = {
+        # Создаем запись события; поля, которые приложение не показывает,
+        # хранятся в событии (Event.extra) под своими именами
+        event_entry = {key: value for key, value in event.items() if key not in FIRESTORE_EVENT_FIELDS}
+        event_entry.update({
+            "id": event["id"],
             "start_time": event["startTime"],
             "end_time": event["endTime"],
             "theme": event["title"],
             "color": event["color"],
-            "description": event["description"],
-            "userId": event["userId"]
-        }
+            "description": event["description"]
+        })
 
         final_data[date].append(event_entry)
 
@@ -74,119 +142,293 @@ def convert_to_final_format(intermediate_data):
 
 
 def get_events_from_firestore():
-    """Получает события из Firestore"""
-    events_ref = db.collection("events")
+    """Получает события из Firestore и запоминает их как синхронизированные"""
+    global synced_events
+    events_ref = get_db().collection("events")
     docs = events_ref.stream()
 
     firebase_events = []
+    remote_state = {}
     for doc in docs:
-        firebase_events.append(doc.to_dict())
+        data = doc.to_dict()
+        remote_state[doc.id] = data
+        firebase_events.append(dict(data, id=doc.id))
 
+    synced_events = remote_state
     return firebase_events
 
 
 def save_to_json(data, filename):
-    """Сохраняет данные в JSON файл без поля 'color'"""
+    """Надёжно сохраняет данные в компактный JSON файл без поля 'color':
+    временный файл, fsync, замена."""
     # Создаем копию данных, чтобы не изменять оригинальный словарь
-    data_to_save = data.copy()
+    data_to_save = dict(data)
     # Удаляем поле 'color', если оно существует
     data_to_save.pop("color", None)
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data_to_save, f, ensure_ascii=False, indent=4)
+    write_json_atomic(filename, data_to_save)
 
-def load_schedule_from_file(schedule_manager):
-    if os.path.exists("schedule.json"):
-        try:
-            # 1. Получаем данные из Firestore
-            firebase_events = get_events_from_firestore()
 
-            # 2. Преобразуем в промежуточный формат
-            intermediate_data = convert_from_firebase_format(firebase_events)
+def _load_local(schedule_manager, journal, persistent, errors):
+    """Загружает снимок schedule.json и журнал; False при ошибке"""
+    try:
+        if not persistent:
+            data = load_local_json(SCHEDULE_FILE) if os.path.exists(SCHEDULE_FILE) else {}
+            schedule_manager.set_schedule(data)
+            # Снимок, затем хвост журнала
+            journal.replay(schedule_manager)
+    except Exception as e:
+        errors.append(f"Не удалось загрузить расписание с диска: {e}")
+        return False
+    print("Расписание загружено из файла (без синхронизации).")
+    return True
 
-            # 3. Преобразуем в конечный формат
-            final_data = convert_to_final_format(intermediate_data)
 
-            # 4. Сохраняем в JSON файл
-            save_to_json(final_data, "schedule.json")
+def _load_remote(schedule_manager, journal, persistent, errors):
+    """Загружает состояние Firestore; False, если Firestore недоступен"""
+    try:
+        # 1. Получаем данные из Firestore
+        firebase_events = get_events_from_firestore()
 
-            with open("schedule.json", "r", encoding="utf-8") as file:
-                data = json.load(file)
-                schedule_manager.schedule = defaultdict(list, data)
-            print("Расписание загружено из файла.")
-        except Exception as e:
-            QMessageBox.warning(None, "Ошибка", f"Не удалось загрузить расписание: {e}")
+        # 2. Преобразуем в промежуточный формат
+        intermediate_data = convert_from_firebase_format(firebase_events)
 
+        # 3. Преобразуем в конечный формат
+        final_data = convert_to_final_format(intermediate_data)
+        final_data.pop("color", None)
 
-def convert_to_firebase_format(local_data):
-    """Преобразует данные из локального формата в формат Firebase"""
-    firebase_events = []
+        # 4. Заполняем расписание прямо из памяти
+        schedule_manager.set_schedule(final_data)
+    except Exception as e:
+        errors.append(f"Не удалось загрузить расписание из Firestore: {e}")
+        return False
+    print("Расписание загружено из Firestore.")
+    try:
+        # Один раз пишем локальную копию (SQLite уже хранит загруженное).
+        # Если в журнале остались изменения сеансов без Firestore, они
+        # применяются поверх него и будут отправлены при сохранении.
+        if not persistent:
+            save_to_json(final_data, SCHEDULE_FILE)
+        if journal.replay(schedule_manager):
+            journal.mark_pending()
+    except Exception as e:
+        errors.append(f"Не удалось сохранить локальную копию расписания: {e}")
+    return True
 
-    # Удаляем поле 'color' из данных, так как это отдельный список цветов
-    colors = local_data.pop("color", [])
 
+def load_schedule_from_file(schedule_manager):
+    """Загружает расписание при запуске и подключает журнал изменений.
+
+    Если есть неотправленные изменения (метка PENDING_SYNC_FILE) или включён
+    офлайн-режим, загружается локальная копия: снимок и журнал. Иначе —
+    состояние Firestore и поверх него журнал, оставшийся от сеансов без
+    Firestore. Если Firestore недоступен, открывается локальная копия; она
+    не отправляется в Firestore и не перезаписывает schedule.json, изменения
+    остаются в журнале. Возвращает список ошибок для показа пользователю.
+    """
+    global sync_allowed, snapshot_allowed
+    sync_allowed = snapshot_allowed = True
+    persistent = schedule_manager.storage.is_persistent
+    pending_path = None if offline_mode else PENDING_SYNC_FILE
+    if persistent:
+        # SQLite сам хранит данные между запусками, снимок ему не нужен
+        journal = ScheduleJournal(SQLITE_JOURNAL_FILE, None, pending_path=pending_path)
+    else:
+        journal = ScheduleJournal(JOURNAL_FILE, SCHEDULE_FILE, pending_path=pending_path)
+
+    has_local_data = (os.path.exists(SCHEDULE_FILE) or journal.has_records() or
+                      (persistent and len(schedule_manager.schedule) > 0))
+    errors = []
+    if offline_mode:
+        loaded = not has_local_data or _load_local(schedule_manager, journal, persistent, errors)
+    elif os.path.exists(PENDING_SYNC_FILE) and has_local_data:
+        # Есть неотправленные изменения: локальные данные новее Firestore
+        # и не должны им перезаписываться, они будут отправлены при сохранении
+        loaded = _load_local(schedule_manager, journal, persistent, errors)
+    else:
+        loaded = _load_remote(schedule_manager, journal, persistent, errors)
+        if not loaded:
+            # Firestore недоступен: открываем локальную копию. Она может быть
+            # старше Firestore, поэтому не отправляется туда ни в этом сеансе,
+            # ни в следующем: журнал не сворачивается в снимок, и при запуске
+            # с сетью поверх Firestore применяются только изменения из него.
+            sync_allowed = snapshot_allowed = False
+            loaded = has_local_data and _load_local(schedule_manager, journal, persistent, errors)
+
+    if not loaded:
+        sync_allowed = snapshot_allowed = False
+    if not snapshot_allowed:
+        # Изменения сеанса копятся в журнале и будут применены поверх
+        # Firestore при следующей успешной загрузке
+        journal.pending_path = None
+        journal.compact_every = None
+    # Дальше каждое изменение сразу дописывается в журнал
+    schedule_manager.attach_journal(journal)
+    return errors
+
+
+# id пользователя для событий, созданных в приложении
+DEFAULT_USER_ID = "0Md4UBw1r3PmfsqXPM9QYHst1hd2"  # Замените на реальный ID пользователя
+
+
+def _firebase_event(date, event):
+    """Документ Firebase для события Event: поля читаются прямо из слотов"""
+    # Поля, загруженные из Firestore и не изменяемые приложением
+    # (tag, allDay, endDate, ...), записываются как были
+    firebase_event = dict(event.extra) if event.extra else {}
+    firebase_event["startDate"] = date
+    firebase_event["startTime"] = event.start_time
+    firebase_event["endTime"] = event.end_time
+    firebase_event["title"] = event.theme  # Используем theme как title
+    firebase_event["description"] = event.description
+    firebase_event["color"] = event.color
+    # Значения по умолчанию для событий, созданных в приложении
+    if "endDate" not in firebase_event:
+        firebase_event["endDate"] = date
+    if "tag" not in firebase_event:
+        firebase_event["tag"] = event.theme  # И theme как tag
+    if "allDay" not in firebase_event:
+        firebase_event["allDay"] = False
+    firebase_event["userId"] = event.user_id if event.user_id is not None else DEFAULT_USER_ID
+    return firebase_event
+
+
+def iter_firebase_events(local_data):
+    """Документы Firebase (id, данные) по одному, день за днём: расписание
+    из SQLite преобразуется без загрузки всех событий в память"""
     for date, events in local_data.items():
+        # Поле 'color' — это отдельный список цветов, а не дата
+        if date == "color":
+            continue
         for event in events:
-            firebase_event = {
+            if isinstance(event, Event):
+                yield event.id, _firebase_event(date, event)
+                continue
+            # Словарь из schedule.json
+            firebase_event = {key: value for key, value in event.items() if key not in Event.KEYS}
+            firebase_event.update({
                 "startDate": date,
-                "endDate": date,  # Можно модифицировать при необходимости
                 "startTime": event["start_time"],
                 "endTime": event["end_time"],
-                "title": event.get("theme", ""),  # Используем theme как title
+                "title": event.get("theme", ""),
                 "description": event.get("description", ""),
-                "tag": event.get("theme", ""),  # И theme как tag
                 "color": event.get("color", "#007AFF"),
-                "allDay": False,  # По умолчанию
-                "userId": event.get("userId", "0Md4UBw1r3PmfsqXPM9QYHst1hd2")  # Замените на реальный ID пользователя
-            }
-            firebase_events.append(firebase_event)
+            })
+            firebase_event.setdefault("endDate", date)
+            firebase_event.setdefault("tag", event.get("theme", ""))
+            firebase_event.setdefault("allDay", False)
+            firebase_event.setdefault("userId", DEFAULT_USER_ID)
+            yield event["id"], firebase_event
 
-    return firebase_events
 
-
-def delete_all_events():
-    """Удаляет все события из коллекции events"""
-    try:
-        # Получаем все документы в коллекции
-        events_ref = db.collection("events")
-        docs = events_ref.stream()
-
-        # Создаем batch для удаления
-        batch = db.batch()
-
-        # Добавляем все документы в batch для удаления
-        deleted_count = 0
-        for doc in docs:
-            batch.delete(doc.reference)
-            deleted_count += 1
-
-        # Выполняем удаление
-        batch.commit()
-        print(f"Удалено {deleted_count} событий")
-        return True
-    except Exception as e:
-        print(f"Ошибка при удалении событий: {e}")
-        return False
+def convert_to_firebase_format(local_data):
+    """Преобразует данные из локального формата в документы Firebase: id -> данные"""
+    return dict(iter_firebase_events(local_data))
+
+
+def diff_events(old_events, new_events):
+    """Возвращает (документы для записи, id документов для удаления).
+
+    new_events — словарь id -> данные или поток пар (id, данные);
+    в памяти остаются только изменившиеся документы и множество id.
+    """
+    if hasattr(new_events, "items"):
+        new_events = new_events.items()
+    to_set = {}
+    new_ids = set()
+    for doc_id, event in new_events:
+        new_ids.add(doc_id)
+        if old_events.get(doc_id) != event:
+            to_set[doc_id] = event
+    to_delete = [doc_id for doc_id in old_events if doc_id not in new_ids]
+    return to_set, to_delete
+
+
+def _commit_chunk(number, total, operations):
+    """Коммитит один batch с повторами; возвращает ошибку или None"""
+    events_ref = get_db().collection("events")
+    error = None
+    for attempt in range(COMMIT_RETRIES):
+        try:
+            batch = get_db().batch()
+            for action, doc_id, data in operations:
+                if action == "delete":
+                    batch.delete(events_ref.document(doc_id))
+                else:
+                    batch.set(events_ref.document(doc_id), data)
+            batch.commit()
+            return None
+        except Exception as e:
+            error = e
+            print(f"Пакет {number}/{total}: попытка {attempt + 1} не удалась: {e}")
+            if attempt + 1 < COMMIT_RETRIES:
+                time.sleep(0.5 * 2 ** attempt)
+    return error
+
+
+def commit_operations(operations, workers=None):
+    """Выполняет операции ("set"/"delete", id, данные) пакетами до BATCH_SIZE,
+    коммитя их параллельно. Возвращает множество id, которые записать не удалось.
+    """
+    chunks = [operations[i:i + BATCH_SIZE] for i in range(0, len(operations), BATCH_SIZE)]
+    failed = set()
+    if not chunks:
+        return failed
+
+    with ThreadPoolExecutor(max_workers=workers or COMMIT_WORKERS) as executor:
+        futures = [executor.submit(_commit_chunk, number, len(chunks), chunk)
+                   for number, chunk in enumerate(chunks, start=1)]
+        for number, (chunk, future) in enumerate(zip(chunks, futures), start=1):
+            error = future.result()
+            if error is not None:
+                print(f"Пакет {number}/{len(chunks)} ({len(chunk)} операций) не записан: {error}")
+                failed.update(doc_id for _, doc_id, _ in chunk)
+    return failed
+
+
+def delete_events(doc_ids):
+    """Удаляет из коллекции events документы с указанными id.
+    Возвращает множество id, которые удалить не удалось."""
+    failed = commit_operations([("delete", doc_id, None) for doc_id in doc_ids])
+    print(f"Удалено {len(doc_ids) - len(failed)} событий")
+    return failed
 
 
 def upload_to_firestore(events):
-    """Загружает события в Firestore"""
-    try:
-        batch = db.batch()
-        events_ref = db.collection("events")
-
-        for event in events:
-            if isinstance(event, dict):  # Исправлено: используем isinstance вместо type()
-                new_doc_ref = events_ref.document()
-                batch.set(new_doc_ref, event)
-
-        # Фиксируем все изменения одной транзакцией
-        batch.commit()
-        print(f"Успешно загружено {len(events)} событий")
-        return True
-    except Exception as e:
-        print(f"Ошибка при загрузке событий: {e}")
-        return False
+    """Создаёт или перезаписывает документы событий (id -> данные) в Firestore.
+    Возвращает множество id, которые записать не удалось."""
+    failed = commit_operations([("set", doc_id, event) for doc_id, event in events.items()])
+    print(f"Успешно загружено {len(events) - len(failed)} событий")
+    return failed
+
+
+def sync_to_firestore(firebase_events):
+    """Приводит коллекцию events к firebase_events (словарь или поток пар
+    (id, данные)), отправляя только изменения.
+    Возвращает список ошибок (пустой, если всё записано)."""
+    global synced_events
+    if synced_events is None:
+        # Состояние коллекции неизвестно (расписание не загружалось из Firestore)
+        get_events_from_firestore()
+
+    to_set, to_delete = diff_events(synced_events, firebase_events)
+    errors = []
+    if to_delete:
+        failed = delete_events(to_delete)
+        # Запоминаем только то, что действительно дошло до Firestore
+        for doc_id in to_delete:
+            if doc_id not in failed:
+                synced_events.pop(doc_id, None)
+        if failed:
+            errors.append(f"Не удалось удалить {len(failed)} старых событий")
+    if to_set:
+        failed = upload_to_firestore(to_set)
+        for doc_id, event in to_set.items():
+            if doc_id not in failed:
+                synced_events[doc_id] = event
+        if failed:
+            errors.append(f"Не удалось загрузить в Firestore {len(failed)} событий")
+    return errors
 
 
 def load_local_json(filename):
@@ -195,25 +437,48 @@ def load_local_json(filename):
         return json.load(f)
 
 
-def save_schedule_to_file(schedule_manager):
+def write_local_schedule(schedule, journal=None):
+    """Надёжно записывает расписание на диск; если передан журнал,
+    он сворачивается в этот снимок.
+
+    Метку несинхронизированных изменений ставит журнал при каждом изменении,
+    а не сохранение. Если расписание при запуске не загрузилось, снимок
+    не перезаписывается.
+    """
+    if not snapshot_allowed:
+        print("Расписание не было загружено: снимок на диске не перезаписывается.")
+        return
+    if journal is not None:
+        if not journal.has_records() and (journal.snapshot_path is None or
+                                          os.path.exists(journal.snapshot_path)):
+            # Снимок уже совпадает с расписанием: переписывать его незачем
+            print("Изменений нет: снимок расписания не перезаписывается.")
+            return
+        journal.compact(schedule)
+    else:
+        save_to_json(schedule, SCHEDULE_FILE)
+    print("Расписание сохранено в файл.")
+
+
+def sync_schedule(schedule, journal=None):
+    """Отправляет расписание в Firestore прямо из памяти.
+    Возвращает список ошибок; при успехе снимает метку несинхронизированных изменений."""
+    if not sync_allowed:
+        # Состояние Firestore при запуске неизвестно: отправка локальной копии
+        # удалила бы из него всё, чего в ней нет. Изменения ждут в журнале.
+        print("Синхронизация пропущена: расписание загружено не из Firestore.")
+        if journal is not None and journal.has_records():
+            return ["Изменения не отправлены в Firestore: при запуске он был недоступен. "
+                    "Они будут отправлены при следующем запуске."]
+        return []
     try:
-        with open("schedule.json", "w", encoding="utf-8") as file:
-            json.dump(dict(schedule_manager.schedule), file, ensure_ascii=False, indent=4)
-        print("Расписание сохранено в файл.")
-
-        # 1. Загружаем данные из локального JSON
-        local_data = load_local_json("schedule.json")
-
-        # 2. Преобразуем в формат Firebase
-        firebase_events = convert_to_firebase_format(local_data)
-
-        # 3. Удаляем все старые события
-        if delete_all_events():
-            # 4. Загружаем новые события
-            if not upload_to_firestore(firebase_events):
-                QMessageBox.warning(None, "Ошибка", "Не удалось загрузить события в Firestore")
-        else:
-            QMessageBox.warning(None, "Ошибка", "Не удалось удалить старые события")
+        # 1. Преобразуем в формат Firebase по мере сравнения, не собирая все документы
+        firebase_events = iter_firebase_events(schedule)
 
+        # 2. Отправляем только изменившиеся события
+        errors = sync_to_firestore(firebase_events)
     except Exception as e:
-        QMessageBox.warning(None, "Ошибка", f"Не удалось сохранить расписание: {e}")
\ No newline at end of file
+        errors = [f"Не удалось синхронизировать расписание: {e}"]
+    if not errors and os.path.exists(PENDING_SYNC_FILE):
+        os.remove(PENDING_SYNC_FILE)
+    return errors
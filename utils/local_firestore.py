@@ -0,0 +1,105 @@
+import threading
+import time
+import uuid
+
+
+class LocalDocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class LocalDocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self):
+        self._collection._client.counts['reads'] += 1
+        return LocalDocumentSnapshot(self, self._collection._docs.get(self.id))
+
+    def set(self, data):
+        self._collection._client.counts['writes'] += 1
+        self._collection._docs[self.id] = dict(data)
+
+    def delete(self):
+        self._collection._client.counts['deletes'] += 1
+        self._collection._docs.pop(self.id, None)
+
+
+class LocalCollectionReference:
+    def __init__(self, client, name):
+        self._client = client
+        self.id = name
+        self._docs = {}
+
+    def document(self, doc_id=None):
+        return LocalDocumentReference(self, doc_id or uuid.uuid4().hex[:20])
+
+    def stream(self):
+        for doc_id, data in list(self._docs.items()):
+            self._client.counts['reads'] += 1
+            yield LocalDocumentSnapshot(LocalDocumentReference(self, doc_id), data)
+
+
+class LocalWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._operations = []
+
+    def set(self, reference, data):
+        self._operations.append((reference.set, (data,)))
+
+    def delete(self, reference):
+        self._operations.append((reference.delete, ()))
+
+    def commit(self):
+        if len(self._operations) > self._client.max_batch_size:
+            raise ValueError(f"maximum {self._client.max_batch_size} writes allowed per request")
+        # Имитация сетевой задержки настоящего Firestore
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        with self._client._lock:
+            self._client.counts['commits'] += 1
+            for operation, args in self._operations:
+                operation(*args)
+        self._operations = []
+
+
+class LocalFirestoreClient:
+    """Локальная замена клиента Firestore, хранящая документы в памяти.
+
+    Повторяет ту часть API firestore.Client, которой пользуется
+    utils.file_utils, и позволяет запускать приложение и проверки без
+    учётных данных и сети. В counts считаются чтения, записи, удаления
+    и коммиты, как их тарифицирует настоящий Firestore; latency задаёт
+    задержку каждого коммита в секундах.
+    """
+
+    def __init__(self, latency=0.0, max_batch_size=500):
+        self.latency = latency
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._collections = {}
+        self.counts = {'reads': 0, 'writes': 0, 'deletes': 0, 'commits': 0}
+
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = LocalCollectionReference(self, name)
+            return self._collections[name]
+
+    def batch(self):
+        return LocalWriteBatch(self)
+
+    def reset_counts(self):
+        for key in self.counts:
+            self.counts[key] = 0